@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+from narration_index import extract_counterparty
+from normalize import DATE_COLUMN_PATTERN, detect_columns, narration_column, to_minor_units
+
+UNKNOWN = "(unknown)"
+
+FIELDS = ["withdrawals", "deposits", "debit_count", "credit_count", "count"]
+
+def empty_bucket():
+    return dict.fromkeys(FIELDS, 0)
+
+def with_difference(bucket):
+    """Copy a bucket and add the withdrawals minus deposits difference."""
+    bucket = dict(bucket)
+    bucket["difference"] = bucket["withdrawals"] - bucket["deposits"]
+    return bucket
+
+def amount_frame(df):
+    """The FIELDS of every row of a normalized transaction frame: its paise amounts and debit/credit/row counts."""
+    withdrawal_column, deposit_column, _ = detect_columns(df)
+    if withdrawal_column is None:
+        raise ValueError("No withdrawal/deposit columns found")
+    withdrawals = df[withdrawal_column].to_numpy(dtype=np.int64)
+    deposits = df[deposit_column].to_numpy(dtype=np.int64)
+    return pd.DataFrame({
+        "withdrawals": withdrawals,
+        "deposits": deposits,
+        "debit_count": withdrawals > 0,
+        "credit_count": deposits > 0,
+        "count": 1,
+    })
+
+class LedgerAggregates:
+    """Running totals per counterparty, month and account, updated as statements are added.
+
+    Amounts are integer paise, as produced by normalize_transactions. Row
+    amounts are kept too, so totals over any set of row ids (such as a
+    name search) are a single array sum.
+    """
+
+    def __init__(self):
+        self.total = empty_bucket()
+        self.by_counterparty = {}
+        self.by_month = {}
+        self.by_account = {}
+        self.withdrawals = np.zeros(0, dtype=np.int64)
+        self.deposits = np.zeros(0, dtype=np.int64)
+
+    def add(self, df, account):
+        """Fold a normalized statement frame into the totals; its rows follow the rows added before."""
+        frame = amount_frame(df)
+        frame["counterparty"] = self.counterparties(df)
+        frame["month"] = self.months(df)
+
+        for key, buckets in (("counterparty", self.by_counterparty), ("month", self.by_month)):
+            grouped = frame.groupby(key, sort=False)[FIELDS].sum()
+            for name, sums in zip(grouped.index, grouped.to_numpy()):
+                self.merge(buckets.setdefault(name, empty_bucket()), sums)
+
+        sums = frame[FIELDS].sum().to_numpy()
+        self.merge(self.by_account.setdefault(account, empty_bucket()), sums)
+        self.merge(self.total, sums)
+
+        self.withdrawals = np.concatenate([self.withdrawals, frame["withdrawals"].to_numpy()])
+        self.deposits = np.concatenate([self.deposits, frame["deposits"].to_numpy()])
+
+    @staticmethod
+    def merge(bucket, sums):
+        for field, value in zip(FIELDS, sums):
+            bucket[field] += int(value)
+
+    @staticmethod
+    def counterparties(df):
+        """Counterparty per row from the layout's narration column."""
+        column = narration_column(df)
+        if column is not None:
+            return df[column].map(extract_counterparty).fillna(UNKNOWN).to_numpy()
+        return np.full(len(df), UNKNOWN, dtype=object)
+
+    @staticmethod
+    def months(df):
+        """Month (YYYY-MM) per row from the first date column."""
+        for column in df.columns:
+            if column is not None and DATE_COLUMN_PATTERN.search(str(column)) and pd.api.types.is_datetime64_any_dtype(df[column]):
+                return df[column].dt.strftime("%Y-%m").fillna(UNKNOWN).to_numpy()
+        return np.full(len(df), UNKNOWN, dtype=object)
+
+    def totals(self):
+        return with_difference(self.total)
+
+    def counterparty(self, name):
+        return with_difference(self.by_counterparty.get(name, empty_bucket()))
+
+    def month(self, month):
+        return with_difference(self.by_month.get(month, empty_bucket()))
+
+    def account(self, account):
+        return with_difference(self.by_account.get(account, empty_bucket()))
+
+    def rows_total(self, rows):
+        """Totals over a subset of row ids, e.g. the result of a narration search."""
+        withdrawals = int(self.withdrawals[rows].sum())
+        deposits = int(self.deposits[rows].sum())
+        return {"withdrawals": withdrawals, "deposits": deposits, "count": len(rows), "difference": withdrawals - deposits}
+
+    def view(self, by):
+        """Pivot view of the "counterparty", "month" or "account" buckets as a DataFrame."""
+        buckets = {"counterparty": self.by_counterparty, "month": self.by_month, "account": self.by_account}[by]
+        df = pd.DataFrame.from_dict(buckets, orient="index", columns=FIELDS)
+        df["difference"] = df["withdrawals"] - df["deposits"]
+        df.index.name = by
+        return df.sort_index()
+
+def check_summary(bucket, summary):
+    """Compare an account's totals with the statement summary from test.py's extract_summary.
+
+    Returns a dict of field -> (expected, actual) for every mismatch; empty means it reconciles.
+    """
+    if not summary:
+        return {}
+    expected = {
+        "debit_count": int(summary["Debit Count"]),
+        "credit_count": int(summary["Credit Count"]),
+        "withdrawals": int(to_minor_units(pd.Series([summary["Total Debits"]]))[0]),
+        "deposits": int(to_minor_units(pd.Series([summary["Total Credits"]]))[0]),
+    }
+    mismatches = {field: (value, bucket[field]) for field, value in expected.items() if bucket[field] != value}
+
+    # Opening balance plus credits minus debits must land on the closing balance
+    opening = int(to_minor_units(pd.Series([summary["Opening Balance"]]))[0])
+    closing = int(to_minor_units(pd.Series([summary["Closing Balance"]]))[0])
+    computed = opening + bucket["deposits"] - bucket["withdrawals"]
+    if computed != closing:
+        mismatches["closing_balance"] = (closing, computed)
+    return mismatches
@@ -0,0 +1,213 @@
+"""Headless bulk statement processing.
+
+Library use:
+
+    from batch import process_statements
+    for result in process_statements(["statements/"], workers=8):
+        ...
+
+Command line:
+
+    python batch.py statements/ "archive/2024-*.pdf" -o ledger.parquet --workers 8
+    python batch.py statements/ -o ledger.xlsx  # Streamed in row chunks, amounts as rupee numbers
+    python batch.py new_statements/ --store ~/ledger  # Append to the partitioned store
+    python batch.py statements/ --metrics metrics.prom --profile-dir profiles/  # Where the time goes
+    python batch.py statements/ --from 2024-04-01 --to 2024-04-30  # Parse only pages dated in April
+    python batch.py statements/ --rules parties.json --summary parties.csv  # Ledger grouped by counterparty, with totals
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import pandas as pd
+
+import metrics
+from aggregates import LedgerAggregates, check_summary
+from categories import COUNTERPARTY_COLUMN, RuleSet, counterparty_ledgers, load_rules
+from document import DEFAULT_PASSWORD_FILE, load_passwords, open_pdf, save_password
+from export import write_table
+from ledger_store import LedgerStore
+from normalize import detect_columns, to_minor_units
+from page_index import page_index, page_ranges, select_pages, within_dates
+from reconcile import reconcile
+from test import clean_transaction_data, parse_bank_statement
+
+def expand_inputs(inputs):
+    """Expand files, directories (searched recursively for PDFs) and glob patterns into a sorted, de-duplicated path list."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, "**", "*.pdf"), recursive=True)
+            matches += glob.glob(os.path.join(item, "**", "*.PDF"), recursive=True)
+        elif glob.has_magic(item):
+            matches = glob.glob(item, recursive=True)
+        else:
+            matches = [item]
+        paths.extend(sorted(matches))
+    return list(dict.fromkeys(paths))
+
+def process_statement(path, password=None, stored_passwords=None, profile_dir=None, pages=None, start=None, end=None):
+    """Parse one statement file. Never raises; failures are reported in the "error" key.
+
+    The file is read and authenticated once, trying password and then
+    stored_passwords; "password" in the result is the one that opened it.
+    With metrics enabled, "metrics" holds this file's stage timings and
+    counters; with profile_dir, a cProfile dump is written there per file.
+    pages ((first, last) page ranges) and start/end dates limit parsing to
+    the pages that can match, found from the cached page index, and the
+    result to the rows dated in the window. A partial statement is not
+    checked against the opening balance or the statement summary, and one
+    with nothing in the window is not an error: its "df" is None and
+    "error" stays None.
+    """
+    result = {"path": path, "df": None, "account": None, "date_range": None, "summary": None, "password": None,
+              "mismatches": {}, "swapped": 0, "breaks": None, "metrics": None,
+              "pages": 0, "transactions": 0, "seconds": 0.0, "error": None}
+    started = time.perf_counter()
+    metrics.reset()  # Pool workers handle many files; count each on its own
+    profile_path = os.path.join(profile_dir, os.path.basename(path) + ".prof") if profile_dir else None
+    try:
+        with metrics.profiled(profile_path), open_pdf(path, password, stored_passwords) as document:
+            result["password"] = document.password
+            partial = pages is not None or start is not None or end is not None
+            selected = select_pages(page_index(document), pages, start, end) if partial else None
+            result["pages"] = document.page_count if selected is None else len(selected)
+            df = None
+            if selected is None or selected:
+                df, account, date_range, summary = parse_bank_statement(document, pages=selected)
+        df = within_dates(clean_transaction_data(df), start, end)
+        if df is None and not partial:
+            raise ValueError("No transactions found")
+
+        # A window with no transactions in it leaves the result empty
+        if df is not None and len(df):
+            # Settle debit/credit sides from the running balance and flag rows that do not add up
+            if detect_columns(df)[2] is not None:
+                opening = int(to_minor_units(pd.Series([summary["Opening Balance"]]))[0]) if summary and not partial else None
+                df, swapped, result["breaks"] = reconcile(df, opening)
+                result["swapped"] = len(swapped)
+
+            # Check the parsed rows against the statement's own summary block
+            if summary and not partial and detect_columns(df)[0] is not None:
+                ledger = LedgerAggregates()
+                ledger.add(df, account)
+                result["mismatches"] = check_summary(ledger.account(account), summary)
+
+            result.update(df=df, account=account, date_range=date_range, summary=summary, transactions=len(df))
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - started
+    if metrics.enabled():
+        result["metrics"] = metrics.snapshot()
+    return result
+
+def process_statements(inputs, password=None, workers=None, stored_passwords=None, profile_dir=None, pages=None, start=None, end=None):
+    """Yield process_statement results for every input file, in input order, using a process pool."""
+    paths = expand_inputs(inputs)
+    if not paths:
+        return
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        yield from pool.map(process_statement, paths, [password] * len(paths), [stored_passwords] * len(paths),
+                            [profile_dir] * len(paths), [pages] * len(paths), [start] * len(paths), [end] * len(paths))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parse bank statement PDFs in bulk into one ledger.")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("-o", "--output", default="ledger.csv", help="output .csv, .parquet or .xlsx file, amounts in rupees (default: ledger.csv)")
+    parser.add_argument("-p", "--password", default=None, help="password for encrypted statements")
+    parser.add_argument("--password-file", default=DEFAULT_PASSWORD_FILE, help="JSON file of stored per-account passwords to try")
+    parser.add_argument("--remember-passwords", action="store_true", help="store the password that opened each account's statements")
+    parser.add_argument("--store", default=None, help="also append transactions to the ledger store in this directory, skipping ones already stored")
+    parser.add_argument("--metrics", default=None, help="write per-stage timings and counters to this .json or .prom file")
+    parser.add_argument("--profile-dir", default=None, help="write a cProfile dump per statement to this directory")
+    parser.add_argument("--pages", type=page_ranges, default=None, help='only parse these pages of each statement, e.g. "1-3,7,10-"')
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, default=None, help="only keep transactions on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, default=None, help="only keep transactions on or before this date (YYYY-MM-DD)")
+    parser.add_argument("--rules", default=None, help="JSON file of counterparty rules, {party: [name or re:pattern, ...]}; groups the ledger by counterparty")
+    parser.add_argument("--summary", default=None, help="write per-counterparty totals to this .csv, .parquet or .xlsx file")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    frames = []
+    party_totals = []
+    files = failed = pages = transactions = 0
+
+    # Rules are compiled once, before any statement is parsed, so a bad pattern stops the run up front
+    try:
+        rules = RuleSet(load_rules(args.rules)) if args.rules else None
+    except ValueError as e:
+        parser.error(f"--rules {args.rules}: {e}")
+
+    if args.metrics:
+        metrics.enable()
+    store = LedgerStore(args.store) if args.store else None
+    stored_passwords = load_passwords(args.password_file)
+    for result in process_statements(args.inputs, args.password, args.workers, stored_passwords, args.profile_dir,
+                                     args.pages, args.start, args.end):
+        files += 1
+        if result["metrics"]:
+            metrics.merge(result["metrics"], result["path"])
+        if result["error"]:
+            failed += 1
+            print(f"FAILED {result['path']}: {result['error']}", file=sys.stderr)
+            continue
+        if result["df"] is None:
+            # Only possible with --pages/--from/--to: nothing of this statement falls in them
+            pages += result["pages"]
+            print(f"{result['path']}: no transactions in the selected pages or dates", file=sys.stderr)
+            continue
+        if args.remember_passwords and result["password"] and stored_passwords.get(result["account"]) != result["password"]:
+            stored_passwords[result["account"]] = result["password"]
+            save_password(result["account"], result["password"], args.password_file)
+        if result["swapped"]:
+            print(f"{result['path']}: moved {result['swapped']} amounts to the side the running balance shows", file=sys.stderr)
+        if result["breaks"] is not None and len(result["breaks"]):
+            print(f"WARNING {result['path']}: balance breaks at\n{result['breaks'].to_string(index=False)}", file=sys.stderr)
+        if result["mismatches"]:
+            print(f"WARNING {result['path']}: does not match statement summary {result['mismatches']}", file=sys.stderr)
+
+        if store is not None:
+            try:
+                added = store.append(result["df"], result["account"], result["path"])
+                print(f"{result['path']}: {added} new transactions stored", file=sys.stderr)
+            except ValueError as e:
+                print(f"WARNING {result['path']}: not stored: {e}", file=sys.stderr)
+
+        df = result["df"]
+        if rules is not None or args.summary:
+            # Every counterparty's rows and totals from one pass over the statement's narrations
+            try:
+                df, totals = counterparty_ledgers(df, rules)
+                party_totals.append(totals)
+            except ValueError as e:
+                print(f"WARNING {result['path']}: no counterparty ledgers: {e}", file=sys.stderr)
+
+        pages += result["pages"]
+        transactions += result["transactions"]
+        frames.append(df.assign(Source=result["path"], Account=result["account"]))
+
+    elapsed = time.perf_counter() - started
+    if frames:
+        ledger = pd.concat(frames, ignore_index=True)
+        if party_totals:
+            # Each party's rows together across statements, still in statement order
+            ledger = ledger.sort_values(COUNTERPARTY_COLUMN, kind="stable", ignore_index=True)
+            if args.summary:
+                write_table(pd.concat(party_totals).groupby(level=0).sum().reset_index(), args.summary)
+        with metrics.stage("write_output"):
+            write_table(ledger, args.output)
+    if args.metrics:
+        metrics.write_report(args.metrics)
+
+    print(f"{files} files ({failed} failed), {pages} pages, {transactions} transactions in {elapsed:.2f}s: "
+          f"{pages / elapsed if elapsed else 0:.1f} pages/s, {transactions / elapsed if elapsed else 0:.1f} transactions/s",
+          file=sys.stderr)
+    return 1 if failed == files else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
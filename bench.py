@@ -0,0 +1,187 @@
+"""Offline benchmark of the statement extractors on synthetic statements with known transactions.
+
+    python bench.py --pages 1 10 100 --layouts hdfc canara
+    python bench.py --pages 1000 --extractors test.text ledgerdaddy --json bench.json
+    python bench.py --pages 1 10 --check bench.json  # exits 1 on a regression against a saved run
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from collections import Counter
+
+import pandas as pd
+
+from normalize import detect_columns, normalize_transactions, to_datetime, to_minor_units
+from records import transactions_frame
+from synthetic import LAYOUTS, generate_statement
+
+def frame_keys(df):
+    """(date, amount in paise) per row of a parsed statement frame."""
+    if df is None or df.empty:
+        return []
+    df = normalize_transactions(df)
+    withdrawal, deposit, _ = detect_columns(df)
+    dates = [column for column in df.columns if pd.api.types.is_datetime64_any_dtype(df[column])]
+    if withdrawal is None or not dates:
+        return []
+    amounts = df[withdrawal] + df[deposit]
+    return list(zip(df[dates[0]].dt.strftime("%Y-%m-%d"), amounts.astype(int)))
+
+def row_keys(rows):
+    """(date, amount in paise) per [date, description, amount, posting date] row from new.py and x.py."""
+    if not rows:
+        return []
+    dates = to_datetime(pd.Series([row[0] for row in rows])).dt.strftime("%Y-%m-%d")
+    amounts = to_minor_units(pd.Series([row[2] for row in rows]), fill=0)
+    return list(zip(dates, amounts))
+
+def run_test_text(path):
+    import test
+    columns, transactions = test.iter_bank_statement(path)
+    return frame_keys(transactions_frame(list(transactions), columns))
+
+def run_test_tables(path):
+    import test
+    return frame_keys(test.parse_bank_statement(path)[0])
+
+def run_ledgerdaddy(path):
+    from document import open_pdf
+    from ingest import extract_page_tables, tables_to_frame
+    with open_pdf(path) as document:
+        return frame_keys(tables_to_frame(extract_page_tables(document.data, 0, document.page_count)))
+
+def run_new(path):
+    import new
+    return row_keys(new.extract_bank_statement(path))
+
+def run_x(path):
+    import x
+    return row_keys(x.extract_bank_statement(path))
+
+def run_camelot(path):
+    import camelot
+    tables = camelot.read_pdf(path, flavor="stream", pages="all")
+    return frame_keys(pd.concat([table.df for table in tables], ignore_index=True).pipe(promote_header))
+
+def run_tabula(path):
+    import tabula
+    return frame_keys(pd.concat(tabula.read_pdf(path, pages="all"), ignore_index=True))
+
+def promote_header(df):
+    df.columns = df.iloc[0]
+    return df[1:]
+
+EXTRACTORS = {
+    "test.text": run_test_text,
+    "test.tables": run_test_tables,
+    "ledgerdaddy": run_ledgerdaddy,
+    "new.py": run_new,
+    "x.py": run_x,
+    "camelot": run_camelot,  # Skipped unless installed
+    "tabula": run_tabula,  # Skipped unless installed
+}
+
+def measure(name, path):
+    """Run one extractor in this (fresh) process and return wall time, peak RSS and extracted keys."""
+    started = time.perf_counter()
+    keys = EXTRACTORS[name](path)
+    wall = time.perf_counter() - started
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    return wall, peak_rss_mb, keys
+
+def accuracy(keys, transactions):
+    """Recall and precision of extracted (date, amount) rows against the ground truth."""
+    truth = Counter((t["date"].isoformat(), t["withdrawal"] + t["deposit"]) for t in transactions)
+    found = Counter((str(d), int(a)) for d, a in keys)
+    matched = sum((truth & found).values())
+    total_found = sum(found.values())
+    return matched / len(transactions), (matched / total_found if total_found else 0.0)
+
+def run(layouts, sizes, extractors, directory, seed):
+    # A fresh process per run keeps peak RSS and import state separate
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for layout in layouts:
+        for pages in sizes:
+            path, page_count, transactions, _ = generate_statement(directory, layout, pages, seed)
+            for name in extractors:
+                with context.Pool(1) as pool:
+                    try:
+                        wall, rss, keys = pool.apply(measure, (name, path))
+                    except ImportError as e:
+                        print(f"skipping {name}: {e}", file=sys.stderr)
+                        continue
+                    except Exception as e:
+                        results.append({"layout": layout, "pages": page_count, "extractor": name, "error": f"{type(e).__name__}: {e}"})
+                        continue
+                recall, precision = accuracy(keys, transactions)
+                results.append({
+                    "layout": layout, "pages": page_count, "extractor": name,
+                    "wall_s": round(wall, 3), "peak_rss_mb": round(rss, 1),
+                    "pages_per_s": round(page_count / wall, 2) if wall else None,
+                    "rows": len(keys), "recall": round(recall, 4), "precision": round(precision, 4),
+                })
+                print(json.dumps(results[-1]), file=sys.stderr)
+    return results
+
+# Largest drop from a baseline run that still passes --check: absolute for recall and precision,
+# a fraction of the baseline for pages/s, whose wall-clock timing varies from run to run
+ACCURACY_TOLERANCE = 0.0
+SPEED_TOLERANCE = 0.25
+
+def regressions(results, baseline, accuracy_tolerance=ACCURACY_TOLERANCE, speed_tolerance=SPEED_TOLERANCE):
+    """Messages for each result worse than the baseline run with the same layout, pages and extractor.
+
+    Results without a baseline entry are not compared; an error where the
+    baseline ran is a regression.
+    """
+    runs = {(run["layout"], run["pages"], run["extractor"]): run for run in baseline}
+    messages = []
+    for result in results:
+        name = f"{result['layout']}/{result['pages']}p/{result['extractor']}"
+        base = runs.get((result["layout"], result["pages"], result["extractor"]))
+        if base is None or "error" in base:
+            continue
+        if "error" in result:
+            messages.append(f"{name}: {result['error']}")
+            continue
+        for metric in ("recall", "precision"):
+            if result[metric] < base[metric] - accuracy_tolerance:
+                messages.append(f"{name}: {metric} {result[metric]} < baseline {base[metric]}")
+        if base["pages_per_s"] and result["pages_per_s"] < base["pages_per_s"] * (1 - speed_tolerance):
+            messages.append(f"{name}: pages/s {result['pages_per_s']} < baseline {base['pages_per_s']}")
+    return messages
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark statement extractors on synthetic statements.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100], help="statement sizes in pages (default: 1 10 100)")
+    parser.add_argument("--layouts", nargs="+", default=list(LAYOUTS), choices=list(LAYOUTS))
+    parser.add_argument("--extractors", nargs="+", default=list(EXTRACTORS), choices=list(EXTRACTORS))
+    parser.add_argument("--dir", default="bench_statements", help="where synthetic PDFs are written and reused")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--check", help="compare with a --json file from an earlier run and exit 1 on a regression")
+    parser.add_argument("--accuracy-tolerance", type=float, default=ACCURACY_TOLERANCE,
+                        help=f"allowed drop in recall or precision for --check (default: {ACCURACY_TOLERANCE})")
+    parser.add_argument("--speed-tolerance", type=float, default=SPEED_TOLERANCE,
+                        help=f"allowed drop in pages/s for --check, as a fraction of the baseline (default: {SPEED_TOLERANCE})")
+    args = parser.parse_args(argv)
+
+    results = run(args.layouts, args.pages, args.extractors, args.dir, args.seed)
+    print(pd.DataFrame(results).to_string(index=False))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.check:
+        with open(args.check) as f:
+            failures = regressions(results, json.load(f), args.accuracy_tolerance, args.speed_tolerance)
+        for message in failures:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        return 1 if failures else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""Counterparty rules applied to every narration at once.
+
+Rules map a party (or category) to the names and patterns that identify
+it, e.g. loaded from JSON:
+
+    {"Vraj Jewellers": ["VRAJ JEWELLERS", "VRAJJEWEL"],
+     "Electricity": ["re:TORRENT ?POWER|BILLPAY"]}
+
+Names match anywhere in a narration, ignoring case, spacing and
+punctuation, like the app's name search; "re:" entries are regular
+expressions over the uppercased narration.
+"""
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from aggregates import FIELDS, UNKNOWN, amount_frame
+from narration_index import NON_ALNUM, extract_counterparty, normalize_narration
+from normalize import narration_column
+
+REGEX_PREFIX = "re:"
+
+# Column added to ledgers for the party each row belongs to
+COUNTERPARTY_COLUMN = "Counterparty"
+
+def load_rules(path):
+    """Rules from a JSON file of {party: [name or "re:pattern", ...]}."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def parse_rule_lines(text):
+    """Rules from lines of "Party: name, name, re:pattern"; a line without a colon is a party matched by its own name."""
+    rules = {}
+    for line in text.splitlines():
+        party, _, entries = line.partition(":")
+        party = party.strip()
+        if party:
+            names = [entry.strip() for entry in entries.split(",") if entry.strip()] or [party]
+            rules.setdefault(party, []).extend(names)
+    return rules
+
+def trie_pattern(words):
+    """A regex matching any of words, laid out as a prefix tree.
+
+    Each position in the text walks the tree once instead of trying
+    every word in turn, and a longer word wins over its prefix.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = None  # A word ends here
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+class RuleSet:
+    """Rules compiled into two matchers: a prefix-tree regex over all names and one alternation of all patterns.
+
+    match() makes one pass over the narrations with each, however many
+    rules there are. Where both kinds match, the name rule wins. Build it
+    once per set of rules; an invalid pattern raises ValueError naming
+    its party.
+    """
+
+    def __init__(self, rules):
+        self.names = {}  # Normalized name -> party
+        patterns = []
+        for party, entries in rules.items():
+            for entry in entries:
+                if entry.startswith(REGEX_PREFIX):
+                    pattern = entry[len(REGEX_PREFIX):]
+                    try:
+                        re.compile(pattern)
+                    except re.error as e:
+                        raise ValueError(f"Invalid pattern for {party}: {pattern!r} ({e})") from None
+                    patterns.append((party, pattern))
+                elif normalize_narration(entry):
+                    self.names.setdefault(normalize_narration(entry), party)
+        self.parties = [party for party, _ in patterns]
+        self.name_matcher = re.compile(f"({trie_pattern(self.names)})") if self.names else None
+        self.pattern_matcher = re.compile(
+            "|".join(f"(?P<rule{i}>{pattern})" for i, (_, pattern) in enumerate(patterns)), re.IGNORECASE
+        ) if patterns else None
+
+    def __len__(self):
+        return len(self.names) + len(self.parties)
+
+    def match(self, narrations):
+        """Party per narration as an object array, None where no rule matches."""
+        narrations = pd.Series(narrations, dtype="string").fillna("").str.upper()
+        parties = np.full(len(narrations), None, dtype=object)
+
+        if self.name_matcher is not None:
+            found = narrations.str.replace(NON_ALNUM.pattern, "", regex=True).str.extract(self.name_matcher, expand=False)
+            parties = np.array(found.map(self.names).to_numpy(dtype=object, na_value=None), dtype=object)
+
+        if self.pattern_matcher is not None:
+            search = self.pattern_matcher.search
+            for row in np.flatnonzero(pd.isna(parties)):
+                match = search(narrations.iat[row])
+                if match:
+                    parties[row] = self.parties[int(match.lastgroup[len("rule"):])]
+        return parties
+
+def rule_set(rules):
+    """rules as a RuleSet, compiling a {party: entries} dict."""
+    return rules if isinstance(rules, RuleSet) else RuleSet(rules or {})
+
+def counterparties(df, rules=None, fallback=True):
+    """Party per row of a transaction frame from rules, else (with fallback) the name in the narration, else UNKNOWN.
+
+    rules is a RuleSet or a {party: entries} dict, which is compiled on each call.
+    """
+    column = narration_column(df)
+    if column is None:
+        return np.full(len(df), UNKNOWN, dtype=object)
+    narrations = df[column]
+    parties = rule_set(rules).match(narrations)
+    missing = pd.isna(parties)
+    if fallback and missing.any():
+        parties[missing] = narrations[missing].map(extract_counterparty).to_numpy()
+    parties[pd.isna(parties)] = UNKNOWN
+    return parties
+
+def counterparty_ledgers(df, rules=None, fallback=True):
+    """Split a normalized frame into per-counterparty ledgers with their totals, in one pass over the rows.
+
+    rules is as for counterparties; pass a RuleSet when splitting several
+    statements so the rules are compiled once.
+
+    Returns (ledger, totals). ledger is df with a Counterparty column,
+    each party's rows together in their original order, so
+    ledger.groupby("Counterparty", sort=False) yields the ledgers.
+    totals has one row per party with the withdrawals, deposits, counts
+    and withdrawals minus deposits difference in paise.
+    """
+    frame = amount_frame(df)
+    with metrics.stage("categorize"):
+        parties = counterparties(df, rules, fallback)
+    frame[COUNTERPARTY_COLUMN] = parties
+    totals = frame.groupby(COUNTERPARTY_COLUMN)[FIELDS].sum().astype(np.int64)
+    totals["difference"] = totals["withdrawals"] - totals["deposits"]
+
+    # A stable sort keeps each party's rows in statement order
+    order = np.argsort(parties.astype(str), kind="stable")
+    ledger = df.assign(**{COUNTERPARTY_COLUMN: parties}).iloc[order].reset_index(drop=True)
+    return ledger, totals
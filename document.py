@@ -0,0 +1,106 @@
+import json
+import os
+
+import fitz  # PyMuPDF
+
+import metrics
+from storage import CONFIG_HOME, atomic_path, default_path
+
+INCORRECT_PASSWORD = "Incorrect password"
+
+# Stored statement passwords, {"account number": "password"}, as banks
+# commonly protect e-passbooks with the account number
+DEFAULT_PASSWORD_FILE = default_path("LEDGERDADDY_PASSWORD_FILE", CONFIG_HOME, "passwords.json")
+
+def load_passwords(path=DEFAULT_PASSWORD_FILE):
+    """Stored per-account passwords, or {} if there are none."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save_password(account, password, path=DEFAULT_PASSWORD_FILE):
+    """Remember the password for an account."""
+    passwords = load_passwords(path)
+    passwords[str(account)] = password
+    # Only the owner can read the file, from the moment it is created
+    with atomic_path(path) as tmp_path, open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+        json.dump(passwords, f, indent=2)
+
+def candidate_passwords(password=None, stored=None):
+    """The entered password first, then stored ones; each tried once."""
+    candidates = [password] if password else []
+    candidates.extend((stored or {}).values())
+    return list(dict.fromkeys(candidates))
+
+def read_source(source):
+    """Bytes of a PDF given as a path, bytes or a binary file object."""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if hasattr(source, "read"):
+        position = source.tell()
+        source.seek(0)
+        data = source.read()
+        source.seek(position)
+        return data
+    with open(source, "rb") as f:
+        return f.read()
+
+class PdfDocument:
+    """A statement PDF read and authenticated once.
+
+    doc is the open PyMuPDF document. data holds the PDF bytes with any
+    encryption removed, so pdfplumber and worker processes open it
+    without a password and without decrypting every object again. For an
+    encrypted file the decrypted bytes are only written out the first
+    time data is read, so a caller that needs just the page count or a
+    cache key pays for authentication alone.
+    """
+
+    def __init__(self, doc, data, encrypted, password):
+        self.doc = doc
+        self._data = data  # None until an encrypted document is first re-serialized
+        self.encrypted = encrypted
+        self.password = password
+
+    @property
+    def data(self):
+        if self._data is None:
+            # Re-serialize without encryption; later opens skip decryption entirely
+            with metrics.stage("decrypt"):
+                self._data = self.doc.tobytes(encryption=fitz.PDF_ENCRYPT_NONE)
+        return self._data
+
+    @property
+    def page_count(self):
+        return self.doc.page_count
+
+    def close(self):
+        self.doc.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def open_pdf(source, password=None, stored=None):
+    """Open a PDF once, trying the given password and then stored ones. Raises PermissionError if none fit.
+
+    An already open PdfDocument is returned as is.
+    """
+    if isinstance(source, PdfDocument):
+        return source
+    data = read_source(source)
+    metrics.count("bytes_read", len(data))
+    with metrics.stage("pymupdf_open"):
+        doc = fitz.open(stream=data, filetype="pdf")
+    if not doc.needs_pass:
+        return PdfDocument(doc, data, False, None)
+
+    for candidate in candidate_passwords(password, stored):
+        if doc.authenticate(candidate):
+            return PdfDocument(doc, None, True, candidate)
+    doc.close()
+    raise PermissionError(INCORRECT_PASSWORD)
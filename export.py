@@ -0,0 +1,184 @@
+"""Ledger export to CSV, Parquet and XLSX, written in row chunks.
+
+    from export import write_table
+    write_table(ledger, "ledger.xlsx")  # or .csv / .parquet
+
+Amounts held as integer paise are written as rupee numbers: exact
+decimal text in CSV, decimal(18, 2) in Parquet and number cells with a
+"#,##0.00" format in XLSX. Dates stay dates. Only one chunk is converted
+at a time, so exporting a large ledger needs no formatted copy of it.
+"""
+import csv
+import os
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import metrics
+from normalize import column_key
+from profiles import PROFILES
+
+FORMATS = ["csv", "parquet", "xlsx"]
+
+CHUNK_ROWS = 50_000
+
+# Paise columns of LedgerAggregates.view and counterparty_ledgers totals
+TOTAL_AMOUNT_COLUMNS = ["withdrawals", "deposits", "difference"]
+
+# Rows per XLSX worksheet, header included; longer tables continue on another sheet
+XLSX_MAX_ROWS = 1_048_576
+
+def amount_columns(df):
+    """Names of the columns of df that hold integer paise.
+
+    Columns are matched on every profile's amount names, since a ledger
+    combined from several layouts can carry more than one set.
+    """
+    keys = {column_key(profile[field]) for profile in PROFILES.values() for field in ("withdrawal", "deposit", "balance")}
+    columns = [column for column in df.columns
+               if column is not None and column_key(column) in keys and pd.api.types.is_numeric_dtype(df[column])]
+    return columns + [column for column in TOTAL_AMOUNT_COLUMNS if column in df.columns and column not in columns]
+
+def export_format(path):
+    """The export format of a path from its extension, "csv" for anything unknown."""
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    return extension if extension in FORMATS else "csv"
+
+def rupee_text(paise):
+    """Integer paise as exact rupee strings like "-1234.05", "" where missing."""
+    missing = paise.isna().to_numpy()
+    values = paise.fillna(0).to_numpy(dtype=np.int64)
+    magnitude = np.abs(values)
+    text = (pd.Series(np.where(values < 0, "-", "")) + (magnitude // 100).astype(str) + "."
+            + pd.Series(magnitude % 100).astype(str).str.zfill(2))
+    return text.where(~missing, "").to_numpy()
+
+def rupee_decimals(paise):
+    """Integer paise as an Arrow decimal(18, 2) array.
+
+    A decimal's stored value is the unscaled integer, which at scale 2
+    is the paise count itself, so the 128-bit values are the paise
+    sign-extended and no rounding can happen.
+    """
+    missing = paise.isna().to_numpy()
+    values = paise.fillna(0).to_numpy(dtype=np.int64)
+    unscaled = np.empty((len(values), 2), dtype=np.int64)
+    unscaled[:, 0] = values
+    unscaled[:, 1] = values >> 63  # High word: 0 or -1
+    validity = pa.array(~missing).buffers()[1] if missing.any() else None
+    return pa.Array.from_buffers(pa.decimal128(18, 2), len(values), [validity, pa.py_buffer(unscaled)], null_count=int(missing.sum()))
+
+def iter_chunks(frames, chunk_rows=CHUNK_ROWS):
+    """Slices of at most chunk_rows rows from a DataFrame or an iterable of DataFrames."""
+    for df in [frames] if isinstance(frames, pd.DataFrame) else frames:
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+
+class CsvWriter:
+    def __init__(self, path, columns, amounts):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.amounts = amounts
+        csv.writer(self.file).writerow(columns)
+
+    def write(self, chunk):
+        chunk = chunk.copy()
+        for column in self.amounts:
+            chunk[column] = rupee_text(chunk[column])
+        chunk.to_csv(self.file, header=False, index=False)
+
+    def close(self):
+        self.file.close()
+
+class ParquetWriter:
+    def __init__(self, path, columns, amounts):
+        self.path = path
+        self.amounts = amounts
+        self.writer = None  # Opened with the first chunk's schema
+
+    def write(self, chunk):
+        arrays = []
+        for i, column in enumerate(chunk.columns):
+            values = chunk.iloc[:, i]
+            if column in self.amounts:
+                arrays.append(rupee_decimals(values))
+            else:
+                # Object columns (None mixed with text) as strings, so no chunk gets a null-typed column
+                arrays.append(pa.array(values.astype("string") if values.dtype == object else values))
+        table = pa.Table.from_arrays(arrays, names=[str(column) for column in chunk.columns])
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+class XlsxWriter:
+    """Streams rows into a workbook in xlsxwriter's constant memory mode, which flushes each row as it is written."""
+
+    def __init__(self, path, columns, amounts):
+        import xlsxwriter
+
+        self.workbook = xlsxwriter.Workbook(path, {"constant_memory": True, "default_date_format": "yyyy-mm-dd"})
+        self.money = self.workbook.add_format({"num_format": "#,##0.00"})
+        self.columns = list(columns)
+        self.amounts = [self.columns.index(column) for column in amounts]
+        self.sheet = None
+        self.row = XLSX_MAX_ROWS  # Forces a sheet on the first row
+
+    def new_sheet(self):
+        self.sheet = self.workbook.add_worksheet()
+        for position in self.amounts:
+            self.sheet.set_column(position, position, 14, self.money)
+        self.sheet.write_row(0, 0, [str(column) for column in self.columns])
+        self.row = 1
+
+    def write(self, chunk):
+        chunk = chunk.copy()
+        for position in self.amounts:
+            chunk.isetitem(position, chunk.iloc[:, position] / 100)
+        chunk = chunk.astype(object)
+        # None and NaT become blank cells; xlsxwriter cannot write NaN or NaT
+        chunk = chunk.where(chunk.notna(), None)
+        for values in chunk.itertuples(index=False, name=None):
+            if self.row == XLSX_MAX_ROWS:
+                self.new_sheet()
+            self.sheet.write_row(self.row, 0, values)
+            self.row += 1
+
+    def close(self):
+        if self.sheet is None:
+            self.new_sheet()
+        self.workbook.close()
+
+WRITERS = {"csv": CsvWriter, "parquet": ParquetWriter, "xlsx": XlsxWriter}
+
+def write_table(frames, path, format=None, amounts=None, chunk_rows=CHUNK_ROWS):
+    """Write a DataFrame, or DataFrames with the same columns, to path one chunk of rows at a time.
+
+    format is "csv", "parquet" or "xlsx" (default: from the extension).
+    amounts names the integer paise columns written as rupees (default:
+    the layout's withdrawal, deposit and balance columns and any total
+    columns). Returns the number of rows written.
+    """
+    chunks = iter_chunks(frames, chunk_rows)
+    first = next(chunks, None)
+    if first is None:
+        first = frames.iloc[:0] if isinstance(frames, pd.DataFrame) else pd.DataFrame()
+    columns = list(first.columns)
+    writer = WRITERS[format or export_format(path)](path, columns, amount_columns(first) if amounts is None else amounts)
+    rows = 0
+    try:
+        for chunk in chain([first], chunks):
+            if list(chunk.columns) != columns:
+                raise ValueError("All frames must have the same columns")
+            with metrics.stage("export"):
+                writer.write(chunk)
+            rows += len(chunk)
+    finally:
+        writer.close()
+    metrics.count("rows_exported", rows)
+    return rows
@@ -0,0 +1,200 @@
+import io
+import os
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import pdfplumber
+
+import metrics
+from document import open_pdf
+from parse_cache import cache_key
+from repair import repair_table
+from ocr import ocr_pages, pages_needing_ocr
+from profiles import detect_profile
+from test import extract_account_info, iter_page_transactions, merge_page_transactions
+
+# Large statements are split into chunks of this many pages so one file
+# can keep several workers busy
+PAGES_PER_CHUNK = 20
+
+# Bump when the extraction output changes so cached parses are not reused
+PARSER_VERSION = 4
+
+# Everything besides the file bytes that affects the extracted tables
+EXTRACTOR_SETTINGS = {"extractor": "pdfplumber.find_table", "header": "first_row", "repair": "explode_collapsed_rows"}
+
+def extract_page_tables(data, first_page, last_page):
+    """Extract the first table of each page in [first_page, last_page) of decrypted PDF bytes.
+
+    Returns (page number, rows) pairs, pages numbered from 1. Rows where
+    one cell holds a whole column of transactions are split back into one
+    row per transaction.
+    """
+    tables = []
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        for page in pdf.pages[first_page:last_page]:
+            metrics.count("pages")
+            with metrics.stage("table_detection", page=page.page_number):
+                table = page.find_table()
+            if table:
+                metrics.count("tables_found")
+                with metrics.stage("table_repair", page=page.page_number):
+                    tables.append((page.page_number, repair_table(page, table)))
+    return tables
+
+def tables_to_frame(tables):
+    """Stack (page number, rows) tables into one DataFrame using the first row as header.
+
+    A Page column records the page each row came from.
+    """
+    if not tables:
+        return None
+    with metrics.stage("concat"):
+        df = pd.concat([pd.DataFrame(rows) for _, rows in tables], ignore_index=True)
+    pages = np.repeat([page for page, _ in tables], [len(rows) for _, rows in tables])
+    df.columns = df.iloc[0]  # First row as header
+    df = df[1:].reset_index(drop=True)
+    df["Page"] = pages[1:]
+    metrics.count("rows", len(df))
+    return df
+
+def statement_account(document):
+    """The account number on the first page of an open PdfDocument, or None."""
+    if not document.page_count:
+        return None
+    with metrics.stage("account_info"):
+        # PyMuPDF's text of one page; cheap, and needs no decrypted copy
+        account, _ = extract_account_info(document.doc[0].get_text())
+    return None if account == "Unknown" else account
+
+def ocr_transactions(document):
+    """(page number, transaction) pairs from the OCR text of an open PdfDocument's scanned pages, [] when it has none.
+
+    Scanned pages hold no table pdfplumber can find, so their text is
+    parsed line by line with the statement's layout profile.
+    """
+    scanned = pages_needing_ocr(document)
+    if not scanned:
+        return []
+    with metrics.stage("ocr"):
+        texts = ocr_pages(document, scanned)
+    metrics.count("ocr_pages", len(scanned))
+    # The bank's name may only be on a scanned first page
+    profile = detect_profile("\n".join([document.doc[0].get_text(), *texts.values()]))
+    return [pair for number in sorted(texts) for pair in iter_page_transactions(number, texts[number], profile)]
+
+def page_chunks(page_count, pages_per_chunk=PAGES_PER_CHUNK):
+    """Split a page count into [start, stop) ranges."""
+    return [(start, min(start + pages_per_chunk, page_count)) for start in range(0, page_count, pages_per_chunk)]
+
+def ingest_files(files, password=None, max_workers=None, pages_per_chunk=PAGES_PER_CHUNK, on_progress=None, cache=None, stored_passwords=None, pool=None):
+    """Parse (name, bytes) statements in a process pool.
+
+    Returns one dict per input file, in input order, with keys "name",
+    "df" (DataFrame or None), "key" (content hash), "account" (account
+    number from the first page, or None), "encrypted", "cached" and
+    "error" (message or None).
+    on_progress(result, done, total) is called as each file finishes.
+    If a ParseCache is given, files parsed before are loaded from it.
+    Each file is opened and authenticated once, trying password and then
+    stored_passwords ({account: password}); workers get decrypted bytes.
+    Pages without a text layer are OCR'd and their transactions merged in
+    page order.
+    Pass a long-lived executor as pool to reuse it instead of starting one.
+    """
+    results = [{"name": name, "df": None, "key": None, "account": None, "encrypted": False, "cached": False, "error": None}
+               for name, _ in files]
+    chunk_tables = [[] for _ in files]  # Per file, one slot per page chunk
+    page_transactions = [[] for _ in files]  # Per file, transactions from OCR'd pages
+    pending = [0] * len(files)
+    jobs = []
+    done = 0
+
+    def finish(index):
+        nonlocal done
+        done += 1
+        if on_progress:
+            on_progress(results[index], done, len(files))
+
+    for index, (name, data) in enumerate(files):
+        # The password is checked even on a cache hit, but nothing is decrypted for one
+        try:
+            document = open_pdf(data, password, stored_passwords)
+        except Exception as e:
+            results[index]["error"] = str(e)
+            finish(index)
+            continue
+
+        with document:
+            results[index]["encrypted"] = document.encrypted
+            results[index]["account"] = statement_account(document)
+            results[index]["key"] = cache_key(data, EXTRACTOR_SETTINGS, PARSER_VERSION)
+            if cache is not None:
+                df = cache.get(results[index]["key"])
+                if df is not None:
+                    results[index]["df"] = df
+                    results[index]["cached"] = True
+                    finish(index)
+                    continue
+
+            try:
+                page_transactions[index] = ocr_transactions(document)
+            except Exception as e:
+                results[index]["error"] = str(e)
+                finish(index)
+                continue
+
+            page_count = document.page_count
+            decrypted = document.data
+
+        chunks = page_chunks(page_count, pages_per_chunk)
+        chunk_tables[index] = [None] * len(chunks)
+        pending[index] = len(chunks)
+        for slot, (start, stop) in enumerate(chunks):
+            jobs.append((index, slot, decrypted, start, stop))
+        if not chunks:
+            finish(index)
+
+    # Only start worker processes when something actually needs parsing
+    if not jobs:
+        return results
+
+    with nullcontext(pool) if pool is not None else ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        futures = {}
+        for index, slot, data, start, stop in jobs:
+            # Whether this chunk's result carries worker numbers is fixed at submit; collection may be switched meanwhile
+            collect = metrics.enabled()
+            if collect:
+                # Workers count into their own process; their numbers come back with the tables
+                future = pool.submit(metrics.collected, extract_page_tables, data, start, stop)
+            else:
+                future = pool.submit(extract_page_tables, data, start, stop)
+            futures[future] = (index, slot, collect)
+
+        for future in as_completed(futures):
+            index, slot, collect = futures[future]
+            try:
+                chunk_tables[index][slot] = future.result()
+                if collect:
+                    chunk_tables[index][slot], worker_metrics = chunk_tables[index][slot]
+                    metrics.merge(worker_metrics, results[index]["name"])
+            except Exception as e:
+                # Keep the first error for the file; its other chunks are ignored
+                results[index]["error"] = results[index]["error"] or str(e)
+                chunk_tables[index][slot] = []
+            pending[index] -= 1
+            if pending[index] == 0:
+                if results[index]["error"] is None:
+                    # Chunks are stored by slot, so page order is preserved
+                    tables = [table for chunk in chunk_tables[index] for table in chunk]
+                    results[index]["df"] = tables_to_frame(tables)
+                    if page_transactions[index]:
+                        results[index]["df"] = merge_page_transactions(results[index]["df"], page_transactions[index])
+                    if cache is not None and results[index]["df"] is not None:
+                        cache.put(results[index]["key"], results[index]["df"])
+                chunk_tables[index] = page_transactions[index] = None
+                finish(index)
+
+    return results
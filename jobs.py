@@ -0,0 +1,125 @@
+import os
+import queue
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+
+from ingest import EXTRACTOR_SETTINGS, PARSER_VERSION, ingest_files
+from parse_cache import cache_key
+
+# Files held in memory waiting for a worker thread, at most
+DEFAULT_QUEUE_SIZE = 16
+
+# Files parsed at the same time; each one's page chunks share the process pool
+DEFAULT_THREADS = 4
+
+# Put on the queue to stop the worker threads; each one puts it back for the next
+STOP = object()
+
+def _work(manager_ref, jobs_queue):
+    """Worker thread loop. It holds the manager only while parsing, so a
+    manager no longer referenced elsewhere can be collected."""
+    while True:
+        item = jobs_queue.get()
+        if item is STOP:
+            jobs_queue.put(STOP)
+            return
+        manager = manager_ref()
+        if manager is None:
+            return
+        manager._parse(*item)
+        del manager
+        jobs_queue.task_done()
+
+def stop_workers(jobs_queue, pool=None):
+    """Cancel the files still queued, stop the worker threads and shut down pool if given."""
+    while True:
+        try:
+            job, _ = jobs_queue.get_nowait()
+        except queue.Empty:
+            break
+        job.update(status="error", error="Cancelled")
+        jobs_queue.task_done()
+    # Draining left room for one sentinel, which every worker passes on
+    jobs_queue.put(STOP)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+class IngestJobs:
+    """Parse statements in the background while the Streamlit script keeps rerunning.
+
+    submit() puts a file on a bounded queue. Worker threads take files off
+    it and parse them with ingest_files on one long-lived process pool.
+    Kept in st.session_state, the manager and its in-flight jobs outlive
+    reruns; the script renders results() on each run. Pass pool to share
+    one executor between sessions; otherwise the manager starts its own.
+    close(), or the manager being garbage collected when its session
+    ends, stops the threads and any pool of its own.
+    """
+
+    def __init__(self, max_queued=DEFAULT_QUEUE_SIZE, threads=DEFAULT_THREADS, max_workers=None, cache=None, stored_passwords=None, pool=None):
+        self.cache = cache
+        self.stored_passwords = stored_passwords
+        self.queue = queue.Queue(maxsize=max_queued)
+        self.owns_pool = pool is None
+        self.pool = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) if pool is None else pool
+        self.jobs = {}  # Content key -> job dict, in submission order
+        self.lock = threading.Lock()
+        for _ in range(threads):
+            # The threads get a weak reference, so they do not keep the manager and its parsed frames alive
+            threading.Thread(target=_work, args=(weakref.ref(self), self.queue), daemon=True).start()
+        self._stop = weakref.finalize(self, stop_workers, self.queue, self.pool if self.owns_pool else None)
+
+    def submit(self, name, data, password=None):
+        """Queue a file for parsing and return its key, or None if the queue is full.
+
+        A file already queued, parsing or parsed is not queued again, unless
+        it failed and a different password is given.
+        """
+        key = cache_key(data, EXTRACTOR_SETTINGS, PARSER_VERSION)
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is not None and not (job["status"] == "error" and job["password"] != password):
+                return key
+            job = {"key": key, "name": name, "status": "queued", "password": password,
+                   "df": None, "account": None, "encrypted": False, "cached": False, "error": None}
+            try:
+                self.queue.put_nowait((job, data))
+            except queue.Full:
+                return None
+            self.jobs[key] = job
+        return key
+
+    def _parse(self, job, data):
+        with self.lock:
+            job["status"] = "parsing"
+        try:
+            result = ingest_files([(job["name"], data)], job["password"], cache=self.cache,
+                                  stored_passwords=self.stored_passwords, pool=self.pool)[0]
+        except Exception as e:
+            result = {"df": None, "account": None, "encrypted": False, "cached": False, "error": str(e)}
+        with self.lock:
+            job.update({field: result[field] for field in ("df", "account", "encrypted", "cached", "error")})
+            job["status"] = "error" if job["error"] else "done"
+
+    def results(self, keys=None):
+        """Snapshot of the jobs for keys, in that order (default: all, in submission order).
+
+        Each is a dict with "key", "name", "status" ("queued", "parsing",
+        "done" or "error"), "df", "account", "encrypted", "cached" and "error".
+        """
+        with self.lock:
+            jobs = list(self.jobs.values()) if keys is None else [self.jobs[key] for key in dict.fromkeys(keys) if key in self.jobs]
+            return [{field: value for field, value in job.items() if field != "password"} for job in jobs]
+
+    def busy(self):
+        """Whether any job is still queued or parsing."""
+        with self.lock:
+            return any(job["status"] in ("queued", "parsing") for job in self.jobs.values())
+
+    def close(self):
+        """Cancel queued files, stop the worker threads and shut down the process pool if this manager started it.
+
+        A shared pool is left running. Files already parsing finish first.
+        """
+        self._stop()
@@ -0,0 +1,72 @@
+import numpy as np
+
+# Words whose tops differ by less than this fraction of the median word height share a row
+ROW_TOLERANCE = 0.5
+
+# Header words closer than this (in points) belong to the same header cell, e.g. "Withdrawal Amt."
+HEADER_GAP = 4.0
+
+def word_arrays(words):
+    """Split pdfplumber words into arrays: x0, x1, top, bottom and an object array of texts."""
+    count = len(words)
+    x0 = np.fromiter((w["x0"] for w in words), dtype=float, count=count)
+    x1 = np.fromiter((w["x1"] for w in words), dtype=float, count=count)
+    top = np.fromiter((w["top"] for w in words), dtype=float, count=count)
+    bottom = np.fromiter((w["bottom"] for w in words), dtype=float, count=count)
+    text = np.array([w["text"] for w in words], dtype=object)
+    return x0, x1, top, bottom, text
+
+def cluster_rows(top, bottom, tolerance=None):
+    """Give each word a row id, numbered top to bottom.
+
+    Tops are sorted once and a new row starts wherever the gap to the
+    previous top exceeds the tolerance, so rows follow the text however
+    tightly lines are spaced rather than fixed-size buckets.
+    """
+    if not len(top):
+        return np.zeros(0, dtype=np.int64)
+    if tolerance is None:
+        tolerance = ROW_TOLERANCE * float(np.median(bottom - top))
+    order = np.argsort(top, kind="stable")
+    starts = np.diff(top[order]) > tolerance
+    rows = np.empty(len(top), dtype=np.int64)
+    rows[order] = np.concatenate(([0], np.cumsum(starts)))
+    return rows
+
+def assign_columns(x0, x1, edges):
+    """Column index per word: the column whose left edge is the last one at or before the word's centre."""
+    return np.searchsorted(np.asarray(edges, dtype=float), (x0 + x1) / 2, side="right") - 1
+
+def header_edges(x0, x1, gap=HEADER_GAP):
+    """Left column edges from a header row's words, split halfway between neighbouring header cells.
+
+    Suits headers that line up with their columns; layouts with centred
+    headers should declare their edges in a profile instead.
+    """
+    order = np.argsort(x0)
+    x0, x1 = x0[order], x1[order]
+    new_cell = x0[1:] - x1[:-1] > gap
+    lefts = np.concatenate(([x0[0]], x0[1:][new_cell]))
+    rights = np.concatenate((x1[:-1][new_cell], [x1[-1]]))
+    return np.concatenate(([0.0], (rights[:-1] + lefts[1:]) / 2))
+
+def table_rows(arrays, rows, edges, lines=None):
+    """Yield each row top to bottom as a list of cell strings, one per column.
+
+    When a row spans several text lines, lines gives each word's line id
+    so a cell's words are joined line by line.
+    """
+    x0, x1, _, _, text = arrays
+    if not len(x0):
+        return
+    columns = np.clip(assign_columns(x0, x1, edges), 0, len(edges) - 1)
+
+    # One sort puts words in row, column and reading order
+    order = np.lexsort((x0, columns, rows) if lines is None else (x0, lines, columns, rows))
+    rows, columns, text = rows[order], columns[order], text[order]
+    breaks = np.flatnonzero(np.diff(rows)) + 1
+    for start, stop in zip(np.concatenate(([0], breaks)), np.concatenate((breaks, [len(rows)]))):
+        cells = [[] for _ in edges]
+        for column, word in zip(columns[start:stop], text[start:stop]):
+            cells[column].append(word)
+        yield [" ".join(cell) for cell in cells]
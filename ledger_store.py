@@ -0,0 +1,125 @@
+import os
+import uuid
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as fs
+import pyarrow.parquet as pq
+
+from normalize import date_column, detect_columns, find_column, matching_profile, transaction_keys
+from storage import DATA_HOME, atomic_path, default_path
+
+DEFAULT_STORE_DIR = default_path("LEDGERDADDY_STORE_DIR", DATA_HOME, "ledger")
+
+# One fixed schema for every bank; amounts are integer paise
+SCHEMA = pa.schema([
+    ("key", pa.uint64()),
+    ("date", pa.timestamp("s")),
+    ("narration", pa.string()),
+    ("ref", pa.string()),
+    ("withdrawal", pa.int64()),
+    ("deposit", pa.int64()),
+    ("balance", pa.int64()),
+    ("source", pa.string()),
+])
+
+# Directory layout: <store>/account=<account>/month=<YYYY-MM>/part-<id>.parquet
+PARTITIONING = ds.partitioning(pa.schema([("account", pa.string()), ("month", pa.string())]), flavor="hive")
+
+# Month partition for rows whose date could not be parsed
+UNDATED = "undated"
+
+def ledger_records(df, source=None):
+    """Map a normalized statement frame onto the store schema, with a month column for partitioning."""
+    profile = matching_profile(df)
+    date = date_column(df)
+    if profile is None or date is None:
+        raise ValueError("No date/withdrawal/deposit columns")
+    withdrawal, deposit, balance = detect_columns(df)
+    narration = find_column(df, profile["narration"])
+    ref = find_column(df, profile["ref"])
+
+    dates = df.iloc[:, date]
+    records = pd.DataFrame({
+        "key": transaction_keys(df).to_numpy(),
+        "date": dates.to_numpy(),
+        "narration": df[narration].to_numpy() if narration is not None else None,
+        "ref": df[ref].astype("string").str.strip().to_numpy() if ref is not None else None,
+        "withdrawal": df[withdrawal].to_numpy(),
+        "deposit": df[deposit].to_numpy(),
+        "balance": df[balance].to_numpy() if balance is not None else None,
+        "source": source,
+    })
+    records["month"] = dates.dt.strftime("%Y-%m").fillna(UNDATED).to_numpy()
+    return records
+
+class LedgerStore:
+    """Persistent transaction ledger as Parquet files partitioned by account and month.
+
+    Appends only add transactions whose key is not already in the target
+    partition, so overlapping statement periods are stored once.
+    """
+
+    def __init__(self, directory=DEFAULT_STORE_DIR):
+        self.directory = directory
+        self._keys = {}  # Partition directory -> sorted array of stored keys
+        os.makedirs(directory, exist_ok=True)
+
+    def partition_path(self, account, month):
+        return os.path.join(self.directory, f"account={quote(str(account), safe='')}", f"month={quote(month, safe='')}")
+
+    def partition_keys(self, path):
+        """Stored keys of one partition, read once (key column only, memory-mapped) and then kept."""
+        if path not in self._keys:
+            files = [os.path.join(path, name) for name in os.listdir(path) if name.endswith(".parquet")] if os.path.isdir(path) else []
+            keys = [pq.read_table(f, columns=["key"], memory_map=True)["key"].to_numpy() for f in files]
+            self._keys[path] = np.sort(np.concatenate(keys)) if keys else np.zeros(0, dtype=np.uint64)
+        return self._keys[path]
+
+    def append(self, df, account, source=None):
+        """Add a normalized statement frame to the store. Returns the number of new transactions."""
+        records = ledger_records(df, source)
+        records = records[~records["key"].duplicated()]
+        added = 0
+        for month, part in records.groupby("month", sort=False):
+            path = self.partition_path(account, month)
+            keys = self.partition_keys(path)
+            part = part[~np.isin(part["key"].to_numpy(), keys)]
+            if part.empty:
+                continue
+
+            table = pa.Table.from_pandas(part.drop(columns="month"), schema=SCHEMA, preserve_index=False)
+            with atomic_path(os.path.join(path, f"part-{uuid.uuid4().hex}.parquet")) as tmp_path:
+                pq.write_table(table, tmp_path)
+
+            self._keys[path] = np.sort(np.concatenate((keys, part["key"].to_numpy())))
+            added += len(part)
+        return added
+
+    def query(self, accounts=None, start=None, end=None, columns=None):
+        """Read transactions as a DataFrame, sorted by account and date.
+
+        accounts, start and end (dates) select partitions by directory name
+        before any file is opened; matching files are memory-mapped.
+        """
+        filters = []
+        if accounts is not None:
+            filters.append(("account", "in", [str(account) for account in accounts]))
+        if start is not None:
+            start = pd.Timestamp(start)
+            filters += [("month", ">=", start.strftime("%Y-%m")), ("month", "!=", UNDATED), ("date", ">=", start)]
+        if end is not None:
+            end = pd.Timestamp(end)
+            filters += [("month", "<=", end.strftime("%Y-%m")), ("date", "<=", end)]
+
+        schema = pa.unify_schemas([SCHEMA, PARTITIONING.schema])
+        dataset = ds.dataset(self.directory, schema=schema,
+                             format="parquet", partitioning=PARTITIONING, filesystem=fs.LocalFileSystem(use_mmap=True))
+        if columns is not None:
+            columns = list(dict.fromkeys(["account", *columns]))
+        table = dataset.to_table(columns=columns, filter=pq.filters_to_expression(filters) if filters else None)
+        df = table.to_pandas()
+        return df.sort_values([c for c in ("account", "date") if c in df.columns], kind="stable", ignore_index=True)
@@ -1,15 +1,117 @@
 import streamlit as st
 import pandas as pd
-import fitz  # PyMuPDF
-import pdfplumber  # Extract tables from PDFs
+import numpy as np
+import os
 import random
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from jobs import IngestJobs  # Background parallel parsing that survives reruns
+from document import INCORRECT_PASSWORD, load_passwords  # Stored per-account statement passwords
+from parse_cache import ParseCache  # Parsed tables cached on disk across reruns
+from normalize import detect_columns, format_minor_units, narration_column, normalize_transactions  # Exact paise amounts, datetime dates
+from narration_index import NarrationIndex  # Fast name search over narrations
+from aggregates import LedgerAggregates  # Running totals per counterparty, month and account
+from ledger_store import LedgerStore  # Persistent Parquet ledger, partitioned by account and month
+from reconcile import reconcile  # Running-balance check of every row
+from categories import COUNTERPARTY_COLUMN, RuleSet, counterparty_ledgers, parse_rule_lines  # All counterparty rules in one pass
+from export import FORMATS, amount_columns, write_table  # Chunked CSV/Parquet/XLSX export with typed amounts
+import metrics  # Per-stage timings and counters
+
+@st.cache_resource
+def get_parse_cache():
+    return ParseCache()
+
+@st.cache_resource
+def get_ledger_store():
+    return LedgerStore()
+
+@st.cache_resource
+def get_pool():
+    # One set of worker processes for every session, instead of one per browser tab
+    return ProcessPoolExecutor(max_workers=os.cpu_count())
+
+# How often the page refreshes while statements are still parsing
+POLL_SECONDS = 0.5
+
+def get_jobs():
+    # One background job manager per browser session, kept across reruns
+    if "jobs" not in st.session_state:
+        st.session_state["jobs"] = IngestJobs(cache=get_parse_cache(), stored_passwords=load_passwords(), pool=get_pool())
+    return st.session_state["jobs"]
+
+# Session state of the ledger built from the parsed statements, dropped together when it starts over
+LEDGER_STATE = ("statements", "ledger", "combined_df", "combined_key", "ledgers", "ledgers_rules", "rule_set", "rule_error")
+
+def search_statements(statements, keys, query):
+    """Rows whose narration contains query, searched with each statement's own index.
+
+    Returns (positions in the frame combining the statements of keys in
+    that order, row ids in the LedgerAggregates, which numbers rows in
+    the order statements were added).
+    """
+    positions, ledger_rows = [], []
+    start = 0
+    for key in keys:
+        statement = statements[key]
+        if statement["index"] is not None:
+            rows = statement["index"].search(query)
+            positions.append(rows + start)
+            ledger_rows.append(rows + statement["offset"])
+        start += len(statement["df"])
+    return np.concatenate(positions), np.concatenate(ledger_rows)
+
+def export_download(label, df, stem, token):
+    """Export button for df; the file is written in row chunks only when pressed, then offered for download.
+
+    token identifies what was exported (statements, filters, format), so
+    a download is not offered once it no longer matches the page.
+    """
+    key = f"export_{stem}"
+    if st.button(f"Export {label}", key=f"{key}_button"):
+        previous = st.session_state.get(key)
+        if previous and os.path.exists(previous[1]):
+            os.remove(previous[1])
+        path = os.path.join(tempfile.gettempdir(), f"ledgerdaddy-{uuid.uuid4().hex}.{export_format}")
+        write_table(df, path, export_format)
+        st.session_state[key] = (token, path)
+    exported = st.session_state.get(key)
+    if exported and exported[0] == token and os.path.exists(exported[1]):
+        with open(exported[1], "rb") as f:
+            st.download_button(f"Download {label}", f, file_name=f"{stem}.{export_format}", key=f"{key}_download")
 
 # Streamlit App Title
 st.title("LedgerDaddy!!!!!")
 
+# Optional pipeline metrics; collection is off unless asked for
+show_metrics = st.sidebar.checkbox("Show pipeline metrics")
+if show_metrics:
+    metrics.enable()
+    with st.sidebar:
+        # Numbers so far; the page reruns while parsing, so they keep updating
+        report = metrics.snapshot()
+        st.subheader("Pipeline metrics")
+        stages = pd.DataFrame([{"stage": name, **totals} for name, totals in report["stages"].items()])
+        st.dataframe(stages, use_container_width=True)
+        st.dataframe(pd.Series(report["counters"], name="count"), use_container_width=True)
+        st.download_button("Download JSON", metrics.to_json(report), "metrics.json")
+        st.download_button("Download Prometheus", metrics.to_prometheus(report), "metrics.prom")
+        if st.button("Reset metrics"):
+            metrics.reset()
+else:
+    metrics.disable()
+
 # User input for name
 name = st.text_input("Filter Name:")
 
+# Counterparties to total in bulk, instead of filtering one name at a time
+rule_text = st.sidebar.text_area("Counterparties", help="One per line, as Party: name, name, re:pattern. "
+                                 "Rows no rule matches go under the name found in the narration.")
+
+# Format of exported ledgers; amounts are written as rupee numbers, not formatted text
+export_format = st.sidebar.selectbox("Export format", FORMATS)
+
 # File uploader for PDF
 uploaded_files = st.file_uploader("Upload PDF files", type=["pdf"], accept_multiple_files=True)
 
@@ -17,56 +119,177 @@ if uploaded_files:
     # Ask for PDF password
     password = st.text_input("Enter PDF Password (if required)", type="password")
 
-    all_data = []  # List to store data from all PDFs
+    # Queue new uploads for background parsing; files already queued or parsed are not redone
+    jobs = get_jobs()
+    keys = [jobs.submit(uploaded_file.name, uploaded_file.getvalue(), password) for uploaded_file in uploaded_files]
+    statuses = jobs.results(key for key in keys if key is not None)
+    waiting = keys.count(None)
+
+    finished = sum(status["status"] in ("done", "error") for status in statuses)
+    progress_text = f"Parsed {finished}/{len(uploaded_files)} statements"
+    if waiting:
+        progress_text += f" ({waiting} waiting for a free slot)"
+    st.progress(finished / len(uploaded_files), text=progress_text)
+
+    for status in statuses:
+        if status["error"] == INCORRECT_PASSWORD:
+            st.error(f"Incorrect password for {status['name']}! ❌")
+        elif status["error"]:
+            st.error(f"Error processing {status['name']}: {status['error']}")
+        elif status["status"] == "done" and status["encrypted"]:
+            st.success(f"Correct password for {status['name']}! ✅")
+
+    # Statements parsed so far, in upload order; the table fills in as more finish
+    parsed = [status for status in statuses if status["df"] is not None]
 
-    for uploaded_file in uploaded_files:
+    # The ledger only grows as statements finish; removing an upload starts it over
+    added = {key for key, statement in st.session_state.get("statements", {}).items() if statement["offset"] is not None}
+    if not added <= {status["key"] for status in parsed}:
+        for state_key in LEDGER_STATE:
+            st.session_state.pop(state_key, None)
+    if "statements" not in st.session_state:
+        st.session_state.update({"statements": {}, "ledger": LedgerAggregates(), "combined_df": None, "combined_key": (),
+                                 "ledgers": {}, "ledgers_rules": None, "rule_set": None, "rule_error": None})
+    statements = st.session_state["statements"]
+    ledger = st.session_state["ledger"]
+
+    # Normalize, reconcile, total, index and store only the statements that finished since the last run
+    store = get_ledger_store()
+    for result in parsed:
+        if result["key"] in statements:
+            continue
+        # Amounts in paise and dates as datetimes
+        df = normalize_transactions(result["df"])
+        statement = statements[result["key"]] = {"breaks": None, "warnings": [], "offset": None, "index": None}
+
+        # Put each amount on the side the running balance shows and flag rows that do not add up
         try:
-            doc = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-            if doc.needs_pass:
-                if not doc.authenticate(password):
-                    st.error(f"Incorrect password for {uploaded_file.name}! ❌")
-                    continue  # Skip this file
-                else:
-                    st.success(f"Correct password for {uploaded_file.name}! ✅")
+            df, swapped, statement["breaks"] = reconcile(df)
+        except ValueError:
+            pass
+        statement["df"] = df
+
+        # Statements of one account share its totals and partitions; the file name stands in when no number was found
+        account = result["account"] or result["name"]
+        offset = len(ledger.withdrawals)  # The ledger numbers rows after the statements added before
+        try:
+            ledger.add(df, account)
+        except ValueError as e:
+            statement["warnings"].append(f"{result['name']} left out of the ledger: {e}")
+            continue
+        statement["offset"] = offset
+
+        # One index per statement, over its own narration column (Particulars, Narration)
+        narrations = narration_column(df)
+        if narrations is not None:
+            statement["index"] = NarrationIndex(df[narrations])
+
+        # Keep the statement in the persistent ledger; transactions stored before are skipped
+        try:
+            store.append(df, account, result["name"])
+        except ValueError as e:
+            statement["warnings"].append(f"{result['name']} not saved to the ledger: {e}")
+
+    # Statements in the ledger, in upload order whichever finished parsing first
+    ledger_keys = [result["key"] for result in parsed if statements[result["key"]]["offset"] is not None]
+    ledger_key = tuple(ledger_keys)
+    if st.session_state["combined_key"] != ledger_key:
+        # Combine all PDFs data into a single DataFrame, in upload order; only redone when a statement is added
+        frames = [statements[key]["df"] for key in ledger_keys]
+        st.session_state["combined_df"] = pd.concat(frames, ignore_index=True) if frames else None
+        st.session_state["combined_key"] = ledger_key
+    combined_df = st.session_state["combined_df"]
 
-            tables = []
-            with pdfplumber.open(uploaded_file, password=password) as pdf:
-                for page in pdf.pages:
-                    table = page.extract_table()
-                    if table:
-                        tables.append(pd.DataFrame(table))
+    for result in parsed:
+        statement = statements[result["key"]]
+        for warning in statement["warnings"]:
+            st.warning(warning)
+        breaks = statement["breaks"]
+        if breaks is not None and len(breaks):
+            with st.expander(f"⚠️ {result['name']}: {len(breaks)} rows do not match the running balance"):
+                st.dataframe(breaks.assign(balance=breaks["balance"] / 100, expected=breaks["expected"] / 100,
+                                           difference=breaks["difference"] / 100), use_container_width=True)
 
-            if tables:
-                df = pd.concat(tables, ignore_index=True)
-                df.columns = df.iloc[0]  # First row as header
-                df = df[1:].reset_index(drop=True)
-                all_data.append(df)
+    if combined_df is not None:
+        # Every counterparty's ledger and totals in one pass per statement; each statement is redone only when the rules change
+        if st.session_state["ledgers_rules"] != rule_text:
+            # Compiled once per change of the rule box; a bad pattern is reported and the rules left out until fixed
+            try:
+                st.session_state["rule_set"] = RuleSet(parse_rule_lines(rule_text))
+            except ValueError as e:
+                st.session_state["rule_set"] = RuleSet({})
+                st.session_state["rule_error"] = str(e)
+            else:
+                st.session_state["rule_error"] = None
+            st.session_state["ledgers"] = {}
+            st.session_state["ledgers_rules"] = rule_text
+        if st.session_state["rule_error"]:
+            st.sidebar.error(f"Counterparty rules not applied: {st.session_state['rule_error']}")
+        party_ledgers = st.session_state["ledgers"]
+        rules = st.session_state["rule_set"]
+        for key in ledger_keys:
+            if key not in party_ledgers:
+                try:
+                    party_ledgers[key] = counterparty_ledgers(statements[key]["df"], rules)
+                except ValueError:
+                    party_ledgers[key] = None
+        ledgers = [party_ledgers[key] for key in ledger_keys if party_ledgers[key] is not None]
 
-        except Exception as e:
-            st.error(f"Error processing {uploaded_file.name}: {e}")
+        if ledgers:
+            with st.expander("Totals by counterparty"):
+                counterparty_totals = pd.concat([totals for _, totals in ledgers]).groupby(level=0).sum()
+                amounts = amount_columns(counterparty_totals)
+                st.dataframe(counterparty_totals.assign(**{column: counterparty_totals[column] / 100 for column in amounts}),
+                             use_container_width=True)
+                export_download("counterparty totals", counterparty_totals.reset_index(), "counterparty_totals",
+                                (ledger_key, rule_text, export_format))
 
-    if all_data:
-        # Combine all PDFs data into a single DataFrame
-        combined_df = pd.concat(all_data, ignore_index=True)
+                # One party's rows across all statements
+                party = st.selectbox("Show ledger for", counterparty_totals.index)
+                party_rows = pd.concat([party_ledger[party_ledger[COUNTERPARTY_COLUMN] == party] for party_ledger, _ in ledgers],
+                                       ignore_index=True)
+                amounts = amount_columns(party_rows)
+                st.dataframe(party_rows.assign(**{column: party_rows[column] / 100 for column in amounts}), use_container_width=True)
+                export_download(f"{party} ledger", party_rows, "party_ledger", (ledger_key, rule_text, party, export_format))
 
         # Filter by user name
-        if name:
-            filtered_df = combined_df[combined_df["Particulars"].str.contains(name, case=False, na=False)]
+        if name and all(statements[key]["index"] is None for key in ledger_keys):
+            st.warning("No narration column found to search.")
+
+        elif name:
+            rows, ledger_rows = search_statements(statements, ledger_keys, name)
+            filtered_df = combined_df.iloc[rows]
             st.write(f"🔍 Showing results for **{name}**:")
 
-            # Drop Balance column
-            filtered_df = filtered_df.drop("Balance(INR)", axis=1)
+            # The matching rows as they are, typed; the Grand Total row below is only for display
+            export_download("filtered ledger", filtered_df, "filtered_ledger", (ledger_key, name, export_format))
 
-            # Convert Withdrawals and Deposits to numeric
-            filtered_df[['Withdrawals', 'Deposits']] = filtered_df[['Withdrawals', 'Deposits']].replace({',': ''}, regex=True).astype(float).astype(int)
+            # The amount columns of whichever layout the statements have
+            withdrawal, deposit, balance = detect_columns(filtered_df)
+
+            # Drop Balance column
+            if balance is not None:
+                filtered_df = filtered_df.drop(balance, axis=1)
 
-            # Calculate Grand Total row
+            # Grand Total row from the running totals (amounts are integer paise)
             filtered_df= filtered_df.rename(columns={"Reverse\nSweep": "ReverseSweep"})
             print(filtered_df.columns)
-            new_row = pd.DataFrame([{col: filtered_df[col].sum() if col in ['Withdrawals', 'Deposits'] else ('Grand Total' if col == 'Chq.No.' else ( "{:,}".format((filtered_df["Withdrawals"].sum() - filtered_df["Deposits"].sum())) if col == 'ReverseSweep' else ('Difference' if col == 'Autosweep' else ""))) for col in filtered_df.columns}])
+            if withdrawal is not None:
+                totals = ledger.rows_total(ledger_rows)
+                labels = {withdrawal: totals["withdrawals"], deposit: totals["deposits"]}
+                if {'Chq.No.', 'Autosweep', 'ReverseSweep'} <= set(filtered_df.columns):
+                    labels.update({'Chq.No.': 'Grand Total', 'Autosweep': 'Difference',
+                                   'ReverseSweep': format_minor_units(totals["difference"])})
+                else:
+                    # Layouts without spare columns carry the labels in the narration
+                    labels[narration_column(filtered_df)] = f"Grand Total (difference {format_minor_units(totals['difference'])})"
+                new_row = pd.DataFrame([{col: labels.get(col, "") for col in filtered_df.columns}])
+
+                # Append Grand Total row
+                filtered_df = pd.concat([filtered_df, new_row], ignore_index=True)
 
-            # Append Grand Total row
-            filtered_df = pd.concat([filtered_df, new_row], ignore_index=True)
+                # Show amounts in rupees
+                filtered_df[[withdrawal, deposit]] = filtered_df[[withdrawal, deposit]] / 100
 
             # Display DataFrame
             st.dataframe(filtered_df, use_container_width=True)
@@ -74,8 +297,16 @@ if uploaded_files:
         else:
             st.warning("Please enter your name to filter the table.")
 
+    elif jobs.busy() or waiting:
+        st.info("Parsing statements...")
+
     else:
         st.warning("No tables found in any PDFs")
 
+    # Rerun until every upload is parsed; widget changes in between do not restart the jobs
+    if jobs.busy() or waiting:
+        time.sleep(POLL_SECONDS)
+        st.rerun()
+
 else:
     st.info("Please upload PDF files to continue.")
@@ -0,0 +1,144 @@
+"""Per-stage timers and counters for the parse pipeline, off unless enabled.
+
+    import metrics
+    metrics.enable()  # or LEDGERDADDY_METRICS=1
+    ...
+    print(metrics.to_prometheus())
+
+Worker processes collect their own numbers; run work there through
+collected() and merge() the snapshot it returns in the parent.
+"""
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+ENV_FLAG = "LEDGERDADDY_METRICS"
+
+_enabled = os.environ.get(ENV_FLAG) == "1"
+_lock = threading.Lock()
+_stages = {}  # stage -> [calls, seconds]
+_counters = {}  # name -> value
+_pages = {}  # page label -> {stage: seconds}
+
+def enable():
+    """Turn collection on here and in worker processes started from now on."""
+    global _enabled
+    _enabled = True
+    os.environ[ENV_FLAG] = "1"
+
+def disable():
+    """Turn collection off here and in worker processes started from now on; the numbers so far are kept."""
+    global _enabled
+    _enabled = False
+    os.environ.pop(ENV_FLAG, None)
+
+def enabled():
+    return _enabled
+
+def reset():
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+        _pages.clear()
+
+@contextmanager
+def stage(name, page=None):
+    """Time a block as one call of a stage, and against a page when given."""
+    if not _enabled:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        with _lock:
+            totals = _stages.setdefault(name, [0, 0.0])
+            totals[0] += 1
+            totals[1] += elapsed
+            if page is not None:
+                page_stages = _pages.setdefault(str(page), {})
+                page_stages[name] = page_stages.get(name, 0.0) + elapsed
+
+def count(name, value=1):
+    """Add to a counter such as pages, words, tables_found, word_fallbacks, rows or bytes_read."""
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + value
+
+def snapshot():
+    """The numbers so far as a JSON-ready dict."""
+    with _lock:
+        return {
+            "stages": {name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in _stages.items()},
+            "counters": dict(_counters),
+            "pages": {page: dict(stages) for page, stages in _pages.items()},
+        }
+
+def merge(other, label=None):
+    """Add a snapshot from another process; label (e.g. the file name) prefixes its page keys."""
+    with _lock:
+        for name, totals in other["stages"].items():
+            mine = _stages.setdefault(name, [0, 0.0])
+            mine[0] += totals["calls"]
+            mine[1] += totals["seconds"]
+        for name, value in other["counters"].items():
+            _counters[name] = _counters.get(name, 0) + value
+        for page, stages in other["pages"].items():
+            mine = _pages.setdefault(f"{label}:{page}" if label else page, {})
+            for name, seconds in stages.items():
+                mine[name] = mine.get(name, 0.0) + seconds
+
+def collected(function, *args):
+    """Run function(*args) in a worker with collection on and return (result, snapshot).
+
+    A reused worker is left as it was found, so later unwrapped calls there don't collect.
+    """
+    was_enabled = _enabled
+    enable()
+    reset()
+    try:
+        return function(*args), snapshot()
+    finally:
+        if not was_enabled:
+            disable()
+
+def to_json(report=None):
+    return json.dumps(report or snapshot(), indent=2)
+
+def to_prometheus(report=None):
+    """Prometheus text exposition of the stage timers and counters."""
+    report = report or snapshot()
+    lines = [
+        "# TYPE ledgerdaddy_stage_seconds_total counter",
+        *(f'ledgerdaddy_stage_seconds_total{{stage="{name}"}} {totals["seconds"]:.6f}' for name, totals in report["stages"].items()),
+        "# TYPE ledgerdaddy_stage_calls_total counter",
+        *(f'ledgerdaddy_stage_calls_total{{stage="{name}"}} {totals["calls"]}' for name, totals in report["stages"].items()),
+    ]
+    for name, value in report["counters"].items():
+        lines += [f"# TYPE ledgerdaddy_{name}_total counter", f"ledgerdaddy_{name}_total {value}"]
+    return "\n".join(lines) + "\n"
+
+def write_report(path, report=None):
+    """Write a .prom/.txt file in Prometheus text format, anything else as JSON."""
+    text = to_prometheus(report) if path.lower().endswith((".prom", ".txt")) else to_json(report)
+    with open(path, "w") as f:
+        f.write(text)
+
+@contextmanager
+def profiled(path):
+    """cProfile the block into path (a .prof file for snakeviz or flameprof); does nothing if path is None."""
+    if path is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        profiler.dump_stats(path)
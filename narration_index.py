@@ -0,0 +1,107 @@
+import re
+from bisect import bisect_left
+
+import numpy as np
+
+NGRAM = 3
+
+# Narrations are compared with everything but letters and digits removed, so
+# "VRAJ JEWELLERS" and the unspaced "VRAJJEWELLERS" from tighter text extraction match
+NON_ALNUM = re.compile(r"[^0-9A-Z]+")
+
+# Counterparty name in the narration formats seen on HDFC statements, e.g.
+#   NEFT DR-ICIC0000153-J D ORANAMENTS-NETBANK, MUM-N0932...     -> J D ORANAMENTS
+#   RTGS CR-SNBK0000013-VRAJ JEWELLERS-RITESH ...                -> VRAJ JEWELLERS
+#   UPI-SHREE GANESH-shreeganesh@okaxis-UTIB0000123-4123...      -> SHREE GANESH
+#   CHQ DEP - - MICR CLG - NAVRANGPURA EXTN: VATSAL R BAHTIA :BANK OF BARODA -> VATSAL R BAHTIA
+COUNTERPARTY_PATTERNS = [
+    re.compile(r"^(?:NEFT|RTGS|IMPS)\s*(?:CR|DR)\s*-\s*[A-Z]{4}0[A-Z0-9]{6}\s*-\s*([^-]+?)\s*-"),
+    re.compile(r"^UPI\s*-\s*([^-]+?)\s*-"),
+    re.compile(r"^CHQ\s*DEP.*?:\s*([^:]+?)\s*:"),
+]
+
+def normalize_narration(text):
+    """Uppercase and drop everything but letters and digits."""
+    return NON_ALNUM.sub("", text.upper()) if isinstance(text, str) else ""
+
+def extract_counterparty(narration):
+    """Pull the counterparty name out of a NEFT/RTGS/IMPS/UPI/cheque narration, or None."""
+    if not isinstance(narration, str):
+        return None
+    text = narration.upper()
+    for pattern in COUNTERPARTY_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return " ".join(match.group(1).split())
+    return None
+
+class NarrationIndex:
+    """Trigram and token-prefix index over narrations, built once per ledger.
+
+    Rows are identified by their position in the narrations passed in.
+    """
+
+    def __init__(self, narrations):
+        narrations = list(narrations)
+        self.texts = [normalize_narration(text) for text in narrations]
+        self.counterparties = [extract_counterparty(text) for text in narrations]
+
+        postings = {}
+        tokens = {}
+        for row, text in enumerate(self.texts):
+            for gram in {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}:
+                postings.setdefault(gram, []).append(row)
+        for row, narration in enumerate(narrations):
+            for token in set(NON_ALNUM.split(narration.upper() if isinstance(narration, str) else "")):
+                if token:
+                    tokens.setdefault(token, []).append(row)
+
+        # Rows were added in order, so every posting list is already sorted
+        self.postings = {gram: np.array(rows, dtype=np.int64) for gram, rows in postings.items()}
+        self.tokens = sorted(tokens)
+        self.token_rows = [np.array(tokens[token], dtype=np.int64) for token in self.tokens]
+
+    def __len__(self):
+        return len(self.texts)
+
+    def search(self, query):
+        """Return sorted row ids whose narration contains query, ignoring case, spacing and punctuation."""
+        needle = normalize_narration(query)
+        if not needle:
+            return np.arange(len(self.texts))
+
+        if len(needle) < NGRAM:
+            candidates = range(len(self.texts))
+        else:
+            # Intersect the rarest trigram lists first so the candidate set shrinks fastest
+            grams = sorted({needle[i:i + NGRAM] for i in range(len(needle) - NGRAM + 1)},
+                           key=lambda gram: len(self.postings.get(gram, ())))
+            candidates = self.postings.get(grams[0])
+            if candidates is None:
+                return np.array([], dtype=np.int64)
+            for gram in grams[1:]:
+                candidates = np.intersect1d(candidates, self.postings.get(gram, ()), assume_unique=True)
+                if not len(candidates):
+                    return candidates
+
+        # Trigrams can match out of order, so confirm the substring
+        return np.array([row for row in candidates if needle in self.texts[row]], dtype=np.int64)
+
+    def prefix(self, query):
+        """Return sorted row ids with a narration word starting with query."""
+        needle = str(query).upper().strip()
+        start = bisect_left(self.tokens, needle)
+        matches = []
+        for position in range(start, len(self.tokens)):
+            if not self.tokens[position].startswith(needle):
+                break
+            matches.append(self.token_rows[position])
+        if not matches:
+            return np.array([], dtype=np.int64)
+        return np.unique(np.concatenate(matches))
+
+    def counterparty_rows(self, name):
+        """Return row ids whose extracted counterparty contains name."""
+        needle = normalize_narration(name)
+        return np.array([row for row, party in enumerate(self.counterparties)
+                         if party and needle in normalize_narration(party)], dtype=np.int64)
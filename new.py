@@ -1,59 +1,56 @@
 import pdfplumber
-import re
+from profiles import DATE_TOKEN_PATTERN, LOOSE_AMOUNT_PATTERN, detect_profile, iter_section_lines
+from records import Transaction
+
+def iter_pdf_lines(pdf):
+    """Yield the text lines of every page in order."""
+    for page in pdf.pages:
+        yield from (page.extract_text() or "").split("\n")
 
 def extract_bank_statement(pdf_path):
     extracted_data = []
     current_entry = None
-    start_extracting = False 
 
     with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text_lines = page.extract_text().split("\n")
-            
-            for line in text_lines:
-                
-                # Start processing only after "Closing Balance" appears
-                if "ClosingBalance" in line:
-                    start_extracting = True
-                    continue  # Skip this line, move to the next
-                if "HDFCBANKLIMITED" in line:
-                    start_extracting = False
-                if not start_extracting:
-                    continue  # Ignore lines before "Closing Balance"
-
-                # ✅ Find all dates in the line
-                dates = re.findall(r"\b\d{2}/\d{2}/\d{2}\b", line)
-
-                # ✅ Ensure the line contains **exactly two dates**
-                if len(dates) == 2:
-                    # Save the previous entry before starting a new one
-                    if current_entry:
-                        extracted_data.append(current_entry)
-
-                    parts = line.split()
-                    transaction_date, posting_date = dates  # Assign detected dates
-
-                    # Extract amount (should be before posting_date)
-                    amount = ""
-                    for i in range(len(parts) - 2, 0, -1):
-                        if re.match(r"[\d,]+\.\d{2}", parts[i]):  # Look for a valid amount format
-                            amount = parts[i]
-                            description = " ".join(parts[1:i])  # Everything between Date and Amount
-                            break
-                    else:
-                        description = " ".join(parts[1:])  # If no amount is found, assume all is description
-
-                    # Create a new row entry
-                    current_entry = [transaction_date, description, amount, posting_date]
-
+        # Detect the bank layout from the first page; its markers decide where transactions start and stop
+        profile = detect_profile(pdf.pages[0].extract_text() or "") if pdf.pages else None
+        lines = iter_section_lines(iter_pdf_lines(pdf), profile) if profile else []
+
+        for line in lines:
+            # ✅ Find all dates in the line
+            dates = DATE_TOKEN_PATTERN.findall(line)
+
+            # ✅ Ensure the line contains **exactly two dates**
+            if len(dates) == 2:
+                # Save the previous entry before starting a new one
+                if current_entry:
+                    extracted_data.append(current_entry.finish(1))
+
+                parts = line.split()
+                transaction_date, posting_date = dates  # Assign detected dates
+
+                # Extract amount (should be before posting_date)
+                amount = ""
+                for i in range(len(parts) - 2, 0, -1):
+                    if LOOSE_AMOUNT_PATTERN.match(parts[i]):  # Look for a valid amount format
+                        amount = parts[i]
+                        description = " ".join(parts[1:i])  # Everything between Date and Amount
+                        break
                 else:
-                    # If no two dates, assume it's part of the previous row's description
-                    if current_entry:
-                        current_entry[1] += " " + line.strip()  # Append to description column
-            break
+                    description = " ".join(parts[1:])  # If no amount is found, assume all is description
+
+                # Create a new row entry
+                current_entry = Transaction([transaction_date, description, amount, posting_date])
+
+            else:
+                # If no two dates, assume it's part of the previous row's description
+                if current_entry:
+                    current_entry.extend(line.strip())  # Joined onto the description once the entry is complete
         if current_entry:
-            extracted_data.append(current_entry)
-    for row in extracted_data:
-        print(row)
+            extracted_data.append(current_entry.finish(1))
+    return extracted_data
 
-extract_bank_statement("statement.pdf")
+if __name__ == "__main__":
+    # Print extracted data
+    for row in extract_bank_statement("statement.pdf"):
+        print(row)
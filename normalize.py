@@ -0,0 +1,152 @@
+import hashlib
+import re
+import struct
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from profiles import PROFILES
+
+# Sign, rupees, paise and a trailing Cr/Dr marker, after commas, spaces and ₹ are stripped
+AMOUNT_PARTS = r"^(?P<sign>-)?(?P<rupees>\d*)(?:\.(?P<paise>\d{1,2}))?(?P<side>CR|DR)?$"
+
+DATE_COLUMN_PATTERN = re.compile(r"date|dt\b", re.IGNORECASE)  # "Date", "Value Dt", "ValueDt"
+
+# Stands in for a blank balance or an unparsed date in a transaction key; the same value numpy gives NaT
+MISSING_KEY_VALUE = np.iinfo(np.int64).min
+
+def column_key(name):
+    """Compare headers without case or whitespace, so "WithdrawalAmt." matches "Withdrawal Amt."."""
+    return re.sub(r"\s+", "", str(name)).lower()
+
+def find_column(df, name):
+    """Return df's column matching name by column_key, or None."""
+    if name is None:
+        return None
+    key = column_key(name)
+    for column in df.columns:
+        if column_key(column) == key:
+            return column
+    return None
+
+def to_minor_units(values, fill=None):
+    """Convert amount strings such as "1,23,456.7" to integer paise in one vectorized pass.
+
+    Blank or unparseable cells become <NA>, or fill if given. A "Dr" suffix
+    or leading minus makes the amount negative.
+    """
+    text = values.astype("string").str.upper().str.replace(r"[,\s₹]", "", regex=True)
+    parts = text.str.extract(AMOUNT_PARTS)
+    valid = (parts["rupees"].str.len() > 0) | parts["paise"].notna()
+
+    rupees = pd.to_numeric(parts["rupees"].where(parts["rupees"] != "", "0")).astype("Int64")
+    paise = pd.to_numeric(parts["paise"].fillna("0").str.ljust(2, "0")).astype("Int64")
+    minor = rupees * 100 + paise
+    negative = (parts["sign"] == "-") | (parts["side"] == "DR")
+    minor = minor.where(~negative.fillna(False), -minor)
+    minor = minor.where(valid.fillna(False))
+
+    if fill is not None:
+        return minor.fillna(fill).astype("int64")
+    return minor
+
+def to_datetime(values):
+    """Convert DD/MM/YY and DD/MM/YYYY strings (or with dashes) to datetime64; anything else is NaT."""
+    text = values.astype("string").str.strip().str.replace("-", "/", regex=False)
+    long_year = text.str.len() == 10
+    dates = pd.to_datetime(text.where(long_year), format="%d/%m/%Y", errors="coerce")
+    short = pd.to_datetime(text.where(~long_year), format="%d/%m/%y", errors="coerce")
+    return dates.fillna(short)
+
+def format_minor_units(value):
+    """Format integer paise as a rupee string like "1,234.50"."""
+    sign = "-" if value < 0 else ""
+    rupees, paise = divmod(abs(int(value)), 100)
+    return f"{sign}{rupees:,}.{paise:02d}"
+
+def matching_profile(df):
+    """The first profile whose withdrawal and deposit column names are both in df, or None."""
+    for profile in reversed(list(PROFILES.values())):
+        if find_column(df, profile["withdrawal"]) is not None and find_column(df, profile["deposit"]) is not None:
+            return profile
+    return None
+
+def detect_columns(df):
+    """Find the withdrawal, deposit and balance columns from the first profile whose names match."""
+    profile = matching_profile(df)
+    if profile is None:
+        return None, None, None
+    return find_column(df, profile["withdrawal"]), find_column(df, profile["deposit"]), find_column(df, profile["balance"])
+
+def date_column(df):
+    """Position of the first date column ("Date" comes before "Value Dt"), or None."""
+    for i, column in enumerate(df.columns):
+        if column is not None and DATE_COLUMN_PATTERN.search(str(column)):
+            return i
+    return None
+
+def narration_column(df):
+    """Name of the narration column from the first profile whose name is in df, or None."""
+    for profile in reversed(list(PROFILES.values())):
+        column = find_column(df, profile["narration"])
+        if column is not None:
+            return column
+    return None
+
+def row_key(data):
+    """uint64 from the first 8 bytes of a BLAKE2b digest, the same on every platform and library version."""
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+def transaction_keys(df):
+    """A uint64 key per row of a normalized frame from (date, ref no., amount, balance).
+
+    The same transaction in two overlapping statements gets the same key,
+    and keys stay valid in a store written by another pandas version: each
+    row is hashed from fixed-width values (the date as a day number, amounts
+    in paise) and its ref no. text, not from pandas' in-memory layout.
+    Frames without a recognised layout are keyed on the whole row's text.
+    """
+    profile = matching_profile(df)
+    date = date_column(df)
+    if profile is None or date is None:
+        rows = df.astype("string").fillna("").to_numpy()
+        keys = [row_key("\x1f".join(row).encode()) for row in rows]
+        return pd.Series(keys, index=df.index, dtype="uint64")
+
+    withdrawal, deposit, balance = detect_columns(df)
+    ref = find_column(df, profile["ref"])
+    # Day numbers, so datetime64[ns] and datetime64[s] columns key alike
+    days = df.iloc[:, date].to_numpy().astype("datetime64[D]").astype(np.int64)
+    amounts = (df[deposit] - df[withdrawal]).to_numpy(dtype=np.int64)
+    if balance is not None:
+        balances = df[balance].astype("Int64").to_numpy(dtype=np.int64, na_value=MISSING_KEY_VALUE)
+    else:
+        balances = np.full(len(df), MISSING_KEY_VALUE, dtype=np.int64)
+    refs = df[ref].astype("string").str.strip().fillna("").to_numpy() if ref is not None else [""] * len(df)
+    keys = [row_key(struct.pack("<qqq", *values) + text.encode())
+            for *values, text in zip(days.tolist(), amounts.tolist(), balances.tolist(), refs)]
+    return pd.Series(keys, index=df.index, dtype="uint64")
+
+def normalize_transactions(df):
+    """Return a copy of df with amounts as int64 paise and date columns as datetime64.
+
+    Withdrawals and deposits treat blanks as 0; the balance keeps <NA> for
+    blanks. Columns that are not amounts or dates are left as they are.
+    """
+    with metrics.stage("normalize"):
+        df = df.copy()
+        withdrawal, deposit, balance = detect_columns(df)
+
+        for column in (withdrawal, deposit):
+            if column is not None:
+                df[column] = to_minor_units(df[column], fill=0)
+        if balance is not None:
+            df[balance] = to_minor_units(df[balance])
+
+        # By position, since table headers can repeat
+        for i, column in enumerate(df.columns):
+            if column is not None and DATE_COLUMN_PATTERN.search(str(column)):
+                df.isetitem(i, to_datetime(df.iloc[:, i]))
+
+        return df
@@ -0,0 +1,85 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from document import open_pdf
+from storage import CACHE_HOME, atomic_path, default_path
+
+DEFAULT_DPI = 300
+DEFAULT_LANG = "eng"
+DEFAULT_CACHE_DIR = default_path("LEDGERDADDY_OCR_CACHE_DIR", CACHE_HOME, "ocr")
+
+# A page with fewer extractable characters than this is treated as scanned
+MIN_TEXT_CHARS = 20
+
+def has_text_layer(page):
+    """Check whether a PyMuPDF page carries enough real text to skip OCR."""
+    return len(page.get_text("text").strip()) >= MIN_TEXT_CHARS
+
+def pages_needing_ocr(document):
+    """Page numbers (0-based) of an open PdfDocument without a usable text layer."""
+    return [page.number for page in document.doc if not has_text_layer(page)]
+
+def page_hash(doc, page, dpi, lang):
+    """Hash of what OCR would see: the page's content stream and images, plus the OCR settings."""
+    digest = hashlib.sha256()
+    digest.update(page.read_contents())
+    for image in page.get_images(full=True):
+        digest.update(doc.xref_stream_raw(image[0]) or b"")
+    digest.update(f"{page.rect}|{page.rotation}|{dpi}|{lang}".encode())
+    return digest.hexdigest()
+
+def cache_get(cache_dir, key):
+    try:
+        with open(os.path.join(cache_dir, key + ".txt"), encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def cache_put(cache_dir, key, text):
+    with atomic_path(os.path.join(cache_dir, key + ".txt")) as tmp_path, open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+# Each OCR worker opens the document once and keeps it for all the pages it is given
+_worker_doc = None
+
+def _init_worker(data):
+    global _worker_doc
+    _worker_doc = open_pdf(data).doc
+
+def _ocr_page(number, dpi, lang):
+    """Rasterize one page at dpi and run Tesseract on it."""
+    import pytesseract
+    from PIL import Image
+
+    pixmap = _worker_doc[number].get_pixmap(dpi=dpi)
+    image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+    return pytesseract.image_to_string(image, lang=lang)
+
+def ocr_pages(document, page_numbers, dpi=DEFAULT_DPI, lang=DEFAULT_LANG, workers=None, cache_dir=DEFAULT_CACHE_DIR):
+    """OCR the given pages of an open PdfDocument in a process pool. Returns {page number: text}; cached pages are not re-run."""
+    texts = {}
+    keys = {}
+    for number in page_numbers:
+        keys[number] = page_hash(document.doc, document.doc[number], dpi, lang)
+        cached = cache_get(cache_dir, keys[number]) if cache_dir else None
+        if cached is not None:
+            texts[number] = cached
+
+    missing = [number for number in page_numbers if number not in texts]
+    if missing:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(document.data,)) as pool:
+            for number, text in zip(missing, pool.map(_ocr_page, missing, [dpi] * len(missing), [lang] * len(missing))):
+                texts[number] = text
+                if cache_dir:
+                    cache_put(cache_dir, keys[number], text)
+    return texts
+
+def document_text(source, password=None, dpi=DEFAULT_DPI, lang=DEFAULT_LANG, workers=None, cache_dir=DEFAULT_CACHE_DIR):
+    """Text of every page: the text layer where there is one, OCR for scanned pages."""
+    with open_pdf(source, password) as document:
+        texts = [page.get_text("text") for page in document.doc]
+        scanned = [number for number, text in enumerate(texts) if len(text.strip()) < MIN_TEXT_CHARS]
+        for number, text in ocr_pages(document, scanned, dpi, lang, workers, cache_dir).items():
+            texts[number] = text
+    return texts
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import re
+
+import pandas as pd
+
+import metrics
+from normalize import date_column, to_datetime
+from ocr import has_text_layer
+from planner import DATED_LINE_PATTERN
+from storage import CACHE_HOME, atomic_path, default_path
+
+DEFAULT_INDEX_DIR = default_path("LEDGERDADDY_INDEX_DIR", CACHE_HOME, "pages")
+
+# Bump when the index entries change so cached indexes are rebuilt
+INDEX_VERSION = 1
+
+PAGE_RANGE_PATTERN = re.compile(r"^(\d+)(?:(-)(\d*))?$")  # "3", "3-7" or "3-"
+
+def page_ranges(spec):
+    """Parse a page selection like "1-3,7,10-" (1-based, inclusive) into (first, last) pairs; last is None for open ranges."""
+    ranges = []
+    for part in spec.split(","):
+        match = PAGE_RANGE_PATTERN.match(part.strip())
+        if not match or int(match[1]) < 1:
+            raise ValueError(f"Bad page range: {part!r}")
+        first = int(match[1])
+        last = None if match[2] and not match[3] else int(match[3] or first)
+        if last is not None and last < first:
+            raise ValueError(f"Bad page range: {part!r}")
+        ranges.append((first, last))
+    return ranges
+
+def iso_date(value):
+    """A date, datetime or date string as "YYYY-MM-DD", or None."""
+    return None if value is None else pd.Timestamp(value).strftime("%Y-%m-%d")
+
+def page_dates(text):
+    """First and last date at the start of a line of page text, as ISO strings, or (None, None)."""
+    dates = to_datetime(pd.Series([match.strip() for match in DATED_LINE_PATTERN.findall(text)], dtype="string")).dropna()
+    if dates.empty:
+        return None, None
+    return iso_date(dates.min()), iso_date(dates.max())
+
+def build_page_index(document):
+    """One {"first", "last", "text"} entry per page of an open PdfDocument.
+
+    first and last are the earliest and latest dates that open a line of
+    the page's text layer; text is False for pages without one, whose
+    dates are unknown. PyMuPDF's text is used, which is far cheaper than
+    a pdfplumber pass.
+    """
+    index = []
+    for page in document.doc:
+        with metrics.stage("page_index", page=page.number + 1):
+            text = has_text_layer(page)
+            first, last = page_dates(page.get_text("text")) if text else (None, None)
+        index.append({"first": first, "last": last, "text": text})
+    return index
+
+def index_key(document):
+    digest = hashlib.sha256()
+    digest.update(document.data)
+    digest.update(str(INDEX_VERSION).encode())
+    return digest.hexdigest()
+
+def page_index(document, index_dir=DEFAULT_INDEX_DIR):
+    """The page index of an open PdfDocument, read from index_dir when built before (None disables caching)."""
+    path = os.path.join(index_dir, index_key(document) + ".json") if index_dir else None
+    if path:
+        try:
+            with open(path, encoding="utf-8") as f:
+                metrics.count("page_index_hits")
+                return json.load(f)
+        except FileNotFoundError:
+            pass
+
+    index = build_page_index(document)
+    if path:
+        with atomic_path(path) as tmp_path, open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+    return index
+
+def select_pages(index, ranges=None, start=None, end=None):
+    """Page numbers (0-based) that can hold transactions in the page ranges and between the start and end dates.
+
+    Pages without a text layer are kept whenever they are in range, as
+    their dates are unknown; pages with text but no dates are dropped
+    when a date window is given.
+    """
+    start, end = iso_date(start), iso_date(end)
+    selected = []
+    for number, entry in enumerate(index):
+        if ranges and not any(first <= number + 1 and (last is None or number + 1 <= last) for first, last in ranges):
+            continue
+        if (start or end) and entry["text"]:
+            if entry["first"] is None:
+                continue
+            if (start and entry["last"] < start) or (end and entry["first"] > end):
+                continue
+        selected.append(number)
+    metrics.count("pages_skipped", len(index) - len(selected))
+    return selected
+
+def within_dates(df, start=None, end=None):
+    """Rows of a transaction frame dated between start and end, inclusive."""
+    if df is None or (start is None and end is None):
+        return df
+    position = date_column(df)
+    if position is None:
+        return df
+    dates = df.iloc[:, position]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = to_datetime(dates)
+    keep = dates.notna()
+    if start is not None:
+        keep &= dates >= pd.Timestamp(start)
+    if end is not None:
+        keep &= dates <= pd.Timestamp(end)
+    return df[keep.to_numpy()].reset_index(drop=True)
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from storage import CACHE_HOME, atomic_path, default_path
+
+DEFAULT_CACHE_DIR = default_path("LEDGERDADDY_CACHE_DIR", CACHE_HOME, "parse")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Parquet needs unique string column names; table headers can be None or
+# repeated, so the real header is kept in the file's schema metadata
+COLUMNS_KEY = b"ledgerdaddy.columns"
+
+def cache_key(data, settings, parser_version):
+    """Hash the file bytes together with the extractor settings and parser version."""
+    digest = hashlib.sha256()
+    digest.update(data)
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    digest.update(str(parser_version).encode())
+    return digest.hexdigest()
+
+class ParseCache:
+    """Size-bounded on-disk LRU cache of parsed transaction tables stored as Parquet."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".parquet")
+
+    def get(self, key):
+        """Return the cached DataFrame for key, or None on a miss."""
+        path = self.path(key)
+        try:
+            table = pq.read_table(path)
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+        # Reads bump the mtime, which is what eviction orders by
+        os.utime(path)
+        df = table.to_pandas()
+        columns = (table.schema.metadata or {}).get(COLUMNS_KEY)
+        if columns is not None:
+            df.columns = json.loads(columns)
+        return df
+
+    def put(self, key, df):
+        """Store df under key and evict least recently used entries over the size bound."""
+        stored = df.copy()
+        stored.columns = [str(i) for i in range(len(df.columns))]
+        table = pa.Table.from_pandas(stored, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[COLUMNS_KEY] = json.dumps([None if c is None else str(c) for c in df.columns]).encode()
+        table = table.replace_schema_metadata(metadata)
+
+        with atomic_path(self.path(key)) as tmp_path:
+            pq.write_table(table, tmp_path)
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".parquet"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Remove every cached entry."""
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".parquet"):
+                os.remove(entry.path)
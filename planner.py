@@ -0,0 +1,133 @@
+import re
+
+import metrics
+from layout import cluster_rows, table_rows, word_arrays
+from profiles import AMOUNT_PATTERN, GENERIC
+from repair import DATE_LINE_PATTERN, WORD_X_TOLERANCE, repair_table
+
+# Settings for borderless tables
+TABLE_SETTINGS = {
+    "vertical_strategy": "text",
+    "horizontal_strategy": "text",
+    "min_words_vertical": 2,
+    "min_words_horizontal": 1,
+    "snap_tolerance": 5,
+    "intersection_tolerance": 3,
+    "edge_min_length": 3,
+    "text_tolerance": 3,
+    "join_tolerance": 3,
+}
+
+# Page text lines that open a transaction; their count is what a strategy has to reproduce
+DATED_LINE_PATTERN = re.compile(r"^\s*" + DATE_LINE_PATTERN.pattern + r"\b", re.MULTILINE)
+
+# Cheapest first; "columns" needs edges from the profile or an earlier "text" probe
+STRATEGIES = ["lines", "columns", "text"]
+
+def is_dated(row):
+    """Whether a row's first non-empty cell starts with a date."""
+    first = next((cell for cell in row if cell), "")
+    return bool(DATE_LINE_PATTERN.match(first.strip()))
+
+def row_text(row):
+    """A row's cells as one line; wrapped cells such as "Reverse\nSweep" are joined with a space."""
+    return " ".join(" ".join(cell.split()) for cell in row if cell)
+
+def is_header_row(row):
+    """Check whether a table row names the transaction columns."""
+    return any(header in ' '.join(cell or "" for cell in row).upper() for header in ["DATE", "NARRATION", "AMOUNT", "BALANCE"])
+
+def transaction_rows(rows, profile):
+    """Trim a page's rows to its transactions: from the header or first dated row up to the profile's stop marker."""
+    first = next((i for i, row in enumerate(rows) if is_dated(row)), None)
+    if first is None:
+        return []
+    previous = rows[first - 1] if first > 0 else None
+    # Only a row naming the columns is kept; the start marker alone also matches page headers
+    if previous is not None and is_header_row(previous) and profile["start"].search(row_text(previous)):
+        first -= 1  # Keep the column header
+    kept = []
+    for row in rows[first:]:
+        if profile["stop"] is not None and profile["stop"].search(row_text(row)):
+            break
+        kept.append(row)
+    return kept
+
+def is_valid(rows, expected):
+    """A page's rows pass when they hold one dated row, with an amount, per dated line of the page text."""
+    dated = [row for row in rows if is_dated(row)]
+    return len(dated) == expected and all(any(AMOUNT_PATTERN.fullmatch((cell or "").strip()) for cell in row) for row in dated)
+
+def table_edges(tables):
+    """Left column edges of the row with the most cells in pdfplumber tables, or None."""
+    rows = [row.cells for table in tables for row in table.rows]
+    if not rows:
+        return None
+    cells = max(rows, key=lambda cells: sum(cell is not None for cell in cells))
+    return [cell[0] for cell in cells if cell is not None]
+
+class TablePlanner:
+    """Choose a table strategy on the first pages with transactions and reuse it on the rest.
+
+    Strategies are probed cheapest first: ruled lines, then column edges
+    (the profile's, or learned from a text-alignment probe) applied to
+    the page's words, then pdfplumber's text alignment. Once one passes,
+    later pages run only that strategy; a page whose rows fail validation
+    is probed again, which may change the plan.
+    """
+
+    def __init__(self, profile=GENERIC, x_tolerance=WORD_X_TOLERANCE):
+        self.profile = profile
+        self.x_tolerance = x_tolerance
+        self.edges = profile["columns"]
+        self.strategy = None
+
+    def run(self, strategy, page):
+        """Rows from one strategy, trimmed to the page's transactions, and column edges learned on the way."""
+        edges = None
+        with metrics.stage(f"strategy_{strategy}", page=page.page_number):
+            if strategy == "lines":
+                # Pages without drawn lines or boxes cannot have ruled tables
+                tables = page.find_tables() if page.lines or page.rects else []
+                metrics.count("tables_found", len(tables))
+                rows = [row for table in tables for row in repair_table(page, table, self.x_tolerance)]
+            elif strategy == "columns":
+                # Rows come from the page's words rather than a detected table
+                metrics.count("word_fallbacks")
+                words = page.extract_words(x_tolerance=self.x_tolerance)
+                metrics.count("words", len(words))
+                arrays = word_arrays(words)
+                rows = list(table_rows(arrays, cluster_rows(arrays[2], arrays[3]), self.edges))
+            else:
+                tables = page.find_tables(TABLE_SETTINGS)
+                metrics.count("tables_found", len(tables))
+                rows = [row for table in tables for row in repair_table(page, table, self.x_tolerance)]
+                edges = table_edges(tables)
+        return transaction_rows(rows, self.profile), edges
+
+    def page_rows(self, page, text):
+        """Transaction rows of one page, given its text; [] when the text has none, None when no strategy reproduces them."""
+        expected = len(DATED_LINE_PATTERN.findall(text))
+        if not expected:
+            return []  # Nothing to extract; no strategy is run
+
+        if self.strategy is not None:
+            rows, _ = self.run(self.strategy, page)
+            if is_valid(rows, expected):
+                return rows
+            metrics.count("reprobes")
+
+        for strategy in STRATEGIES:
+            if strategy == self.strategy or (strategy == "columns" and self.edges is None):
+                continue
+            metrics.count("probes")
+            rows, edges = self.run(strategy, page)
+            if is_valid(rows, expected):
+                self.strategy = strategy
+                if edges is not None:
+                    # Reuse the text-aligned columns on later pages without re-detecting them
+                    self.edges = edges
+                    self.strategy = "columns"
+                return rows
+        self.strategy = None
+        return None
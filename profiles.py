@@ -0,0 +1,112 @@
+import re
+
+# Patterns shared by every layout, compiled once
+DATE_PATTERN = re.compile(r"\d{2}/\d{2}/\d{2}")  # Anywhere in a cell or line
+DATE_TOKEN_PATTERN = re.compile(r"\b\d{2}/\d{2}/\d{2}\b")  # A whole DD/MM/YY token
+LINE_DATE_PATTERN = re.compile(r"(\d{2}/\d{2}/\d{2})\s")  # A line that starts with a date
+AMOUNT_PATTERN = re.compile(r"\d{1,3}(?:,\d{3})*\.\d{2}")
+LOOSE_AMOUNT_PATTERN = re.compile(r"[\d,]+\.\d{2}")
+
+TRANSACTION_PATTERN = re.compile(
+    r"(\d{2}/\d{2}/\d{2})\s+(.*?)\s+([A-Z0-9]+\d{2,})\s+(\d{2}/\d{2}/\d{2})\s+(\d{1,3}(?:,\d{3})*\.\d{2})?\s+(\d{1,3}(?:,\d{3})*\.\d{2})?\s+(\d{1,3}(?:,\d{3})*\.\d{2})"
+)
+
+STATEMENT_HEADERS = ["Date", "Narration", "Chq./Ref.No.", "Value Dt", "Withdrawal Amt.", "Deposit Amt.", "Closing Balance"]
+
+# A layout profile declares, once, everything the parsers need to know about a bank's statement:
+#   name          registry key
+#   detect        pattern searched in the first page's text to recognise the layout (None matches anything)
+#   start / stop  patterns for lines that open and close a run of transaction lines; the marker lines
+#                 themselves are skipped, and a stop is followed by the next start (e.g. on the next page)
+#   headers       column names in order
+#   columns       left x-edge of each column in PDF points, for word-coordinate extractors
+#   transaction   pattern for a complete single-line transaction
+#   debit_markers narration fragments that mark a lone amount as a withdrawal
+#   narration, ref, withdrawal, deposit, balance
+#                 header names of those columns in the layout's own tables
+PROFILES = {}
+
+def register_profile(profile):
+    """Add a layout profile to the registry; later registrations are detected first."""
+    PROFILES[profile["name"]] = profile
+    return profile
+
+def get_profile(name):
+    """Look up a registered profile by name."""
+    return PROFILES[name]
+
+def detect_profile(text):
+    """Return the first registered profile whose detect pattern matches the text."""
+    for profile in reversed(list(PROFILES.values())):
+        if profile["detect"] is None or profile["detect"].search(text):
+            return profile
+    return GENERIC
+
+def iter_section_lines(lines, profile, key=None):
+    """Yield only the lines between a profile's start and stop markers.
+
+    key turns an item into the text the markers are searched in, for
+    items that are not plain strings (e.g. rows of cells).
+    """
+    inside = False
+    for line in lines:
+        text = key(line) if key else line
+        if profile["stop"] is not None and profile["stop"].search(text):
+            inside = False
+        elif profile["start"].search(text):
+            inside = True
+        elif inside:
+            yield line
+
+def has_section(lines, profile):
+    """Check whether any line opens a transaction section for the profile."""
+    return any(profile["start"].search(line) for line in lines)
+
+GENERIC = register_profile({
+    "name": "generic",
+    "detect": None,
+    "start": re.compile(r"^\s*Date.*Narration.*Closing Balance"),
+    "stop": re.compile(r"STATEMENT SUMMARY"),
+    "headers": STATEMENT_HEADERS,
+    "columns": None,
+    "transaction": TRANSACTION_PATTERN,
+    "debit_markers": ("DR-", "BILLPA"),
+    "narration": "Narration",
+    "ref": "Chq./Ref.No.",
+    "withdrawal": "Withdrawal Amt.",
+    "deposit": "Deposit Amt.",
+    "balance": "Closing Balance",
+})
+
+HDFC = register_profile({
+    "name": "hdfc",
+    "detect": re.compile(r"HDFC\s*BANK"),
+    # Page 1 has the column header; later pages go straight from the account block to transactions
+    "start": re.compile(r"Closing\s*Balance\s*$|Statement\s*of\s*account"),
+    "stop": re.compile(r"HDFC\s*BANK\s*LIMITED|STATEMENT\s*SUMMARY"),
+    "headers": STATEMENT_HEADERS,
+    "columns": [0, 70, 280, 358, 400, 475, 555],
+    "transaction": TRANSACTION_PATTERN,
+    "debit_markers": ("DR-", "BILLPA"),
+    "narration": "Narration",
+    "ref": "Chq./Ref.No.",
+    "withdrawal": "Withdrawal Amt.",
+    "deposit": "Deposit Amt.",
+    "balance": "Closing Balance",
+})
+
+CANARA = register_profile({
+    "name": "canara",
+    "detect": re.compile(r"Canara|CNRB\d", re.IGNORECASE),
+    "start": re.compile(r"Particulars.*Balance"),
+    "stop": None,
+    "headers": None,  # Taken from the table header row
+    "columns": None,
+    "transaction": None,
+    "debit_markers": ("DR-", "BILLPA"),
+    "narration": "Particulars",
+    "ref": "Chq.No.",
+    "withdrawal": "Withdrawals",
+    "deposit": "Deposits",
+    "balance": "Balance(INR)",
+})
@@ -1,16 +1,6 @@
-import pytesseract
-from pdf2image import convert_from_path
+from ocr import document_text
 
-# Convert PDF pages to images
-images = convert_from_path("statement.pdf")
+# Text layer where the page has one, OCR (in parallel, cached per page) where it does not
+full_text = "\n".join(document_text("statement.pdf", dpi=300))
 
-# Extract text using pytesseract
-extracted_text = []
-for img in images:
-    text = pytesseract.image_to_string(img)
-    extracted_text.append(text)
-
-# Combine text from all pages
-full_text = "\n".join(extracted_text)
-
-print(full_text)
\ No newline at end of file
+print(full_text)
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+from normalize import detect_columns
+
+# Provenance column added by ingest; reported with each break when present
+PAGE_COLUMN = "Page"
+
+def previous_balances(balance, known, starts):
+    """Last known balance before each row, not reaching back past the start of its group.
+
+    Returns (previous balance, whether there is one) as arrays.
+    """
+    positions = np.arange(len(balance))
+    last_known = np.maximum.accumulate(np.where(known, positions, -1))
+    previous = np.concatenate(([-1], last_known[:-1]))
+    group_start = np.maximum.accumulate(np.where(starts, positions, 0))
+    has_previous = previous >= group_start
+    return np.where(has_previous, balance[np.maximum(previous, 0)], 0), has_previous
+
+def check_balances(withdrawal, deposit, balance, known, starts, opening=None):
+    """Balance deltas against the previous row, in the given (chronological) order.
+
+    Returns (delta, checkable): checkable rows have a balance and something
+    to compare it with, the opening balance for the first group's first rows.
+    """
+    previous, has_previous = previous_balances(balance, known, starts)
+    if opening is not None:
+        first_group = np.cumsum(starts) == 1
+        previous = np.where(~has_previous & first_group, opening, previous)
+        has_previous |= first_group
+    return balance - previous, known & has_previous
+
+def matched_moves(delta, checkable, withdrawal, deposit):
+    """How many balance moves equal the row's amount, whichever side it was put on."""
+    return np.count_nonzero(checkable & (np.abs(delta) == withdrawal + deposit))
+
+def reconcile(df, opening=None, by=None):
+    """Check each row's balance against the previous balance plus deposits minus withdrawals.
+
+    Works on a normalized frame (amounts in paise) in one array pass. Rows
+    where swapping withdrawal and deposit settles the balance are fixed;
+    rows that still do not reconcile are breaks. by names a column (e.g.
+    the account or source file) whose changes start a new running balance,
+    and opening is the first statement's opening balance in paise.
+    Statements listed newest first are detected and checked that way.
+
+    Returns (fixed frame, positions of the rows whose sides were swapped,
+    breaks) where breaks is a DataFrame with the row position, page (if
+    the frame has a Page column), balance, expected balance and difference.
+    """
+    withdrawal, deposit, balance = detect_columns(df)
+    if withdrawal is None or balance is None:
+        raise ValueError("No withdrawal/deposit/balance columns")
+    if not len(df):
+        # A statement whose table has a header and no transactions; nothing to check
+        empty = np.zeros(0, dtype=np.int64)
+        return df.copy(), empty, breaks_frame(df, empty, empty, empty)
+
+    w = df[withdrawal].to_numpy(dtype=np.int64)
+    d = df[deposit].to_numpy(dtype=np.int64)
+    known = df[balance].notna().to_numpy(dtype=bool)
+    b = df[balance].fillna(0).to_numpy(dtype=np.int64)
+    starts = np.zeros(len(df), dtype=bool)
+    if len(df):
+        starts[0] = True
+    if by is not None:
+        groups = df[by].to_numpy()
+        starts[1:] |= groups[1:] != groups[:-1]
+
+    # Oldest-first or newest-first: whichever order more balance moves match an amount
+    ends = np.concatenate((starts[1:], [True]))
+    forward = check_balances(w, d, b, known, starts)
+    backward = check_balances(w[::-1], d[::-1], b[::-1], known[::-1], ends[::-1])
+    newest_first = matched_moves(*backward, w[::-1], d[::-1]) > matched_moves(*forward, w, d)
+
+    order = slice(None, None, -1) if newest_first else slice(None)
+    w, d, b, known = w[order], d[order], b[order], known[order]
+    delta, checkable = check_balances(w, d, b, known, ends[order] if newest_first else starts, opening)
+
+    ok = checkable & (delta == d - w)
+    swap = checkable & ~ok & (delta == w - d)
+    w, d = np.where(swap, d, w), np.where(swap, w, d)
+    broken = checkable & ~ok & ~swap
+    expected = b - delta + d - w
+
+    # Back to the frame's own row order
+    w, d, b, swap, broken, expected = (a[order] for a in (w, d, b, swap, broken, expected))
+    fixed = df.copy()
+    fixed[withdrawal] = w
+    fixed[deposit] = d
+
+    rows = np.flatnonzero(broken)
+    return fixed, np.flatnonzero(swap), breaks_frame(df, rows, b[rows], expected[rows])
+
+def breaks_frame(df, rows, balance, expected):
+    """The breaks DataFrame of reconcile for the given row positions and their balances."""
+    breaks = pd.DataFrame({"row": rows})
+    if PAGE_COLUMN in df.columns:
+        breaks["page"] = df[PAGE_COLUMN].to_numpy()[rows]
+    breaks["balance"] = balance
+    breaks["expected"] = expected
+    breaks["difference"] = balance - expected
+    return breaks
@@ -0,0 +1,51 @@
+import pandas as pd
+
+class Transaction:
+    """A transaction being parsed: its cells in column order and the narration continuations seen so far.
+
+    Continuation lines are collected as fragments and joined onto the
+    narration once, in finish(), instead of re-concatenating the string
+    for every line. Slots keep the record to two references, where a dict
+    per transaction would repeat every column name.
+    """
+
+    __slots__ = ("values", "fragments")
+
+    def __init__(self, values):
+        self.values = values
+        self.fragments = None
+
+    def extend(self, fragment):
+        if self.fragments is None:
+            self.fragments = []
+        self.fragments.append(fragment)
+
+    def finish(self, narration):
+        """The cell values, with the continuations joined onto the cell at position narration (None to drop them)."""
+        if self.fragments and narration is not None:
+            self.values[narration] = " ".join([self.values[narration], *self.fragments])
+        self.fragments = None
+        return self.values
+
+def column_positions(headers):
+    """Unique column names in order, each with the position of its last occurrence in headers.
+
+    A repeated header keeps one column, filled from its last cell, as a
+    dict keyed by header did.
+    """
+    positions = {}
+    for i, header in enumerate(headers):
+        positions[header] = i
+    return list(positions), list(positions.values())
+
+def row_values(row, positions):
+    """The cells of a table row at positions, "" where the row is too short."""
+    return [row[i] if i < len(row) else "" for i in positions]
+
+def transactions_frame(rows, columns):
+    """Build a DataFrame of string columns from rows of cell values, one column per name in columns.
+
+    The column names and dtype are given up front, so pandas does not
+    have to collect keys and infer types from per-row dicts.
+    """
+    return pd.DataFrame(rows, columns=columns, dtype="str")
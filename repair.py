@@ -0,0 +1,73 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from layout import assign_columns, cluster_rows, table_rows, word_arrays
+from profiles import AMOUNT_PATTERN
+
+# A whole cell line that is a date: DD/MM/YY, DD/MM/YYYY or with dashes
+DATE_LINE_PATTERN = re.compile(r"\d{2}[/-]\d{2}[/-](?:\d{4}|\d{2})")
+
+# Keeps the spaces between narration words that pdfplumber's default tolerance drops
+WORD_X_TOLERANCE = 1.5
+
+def cell_lines(cell):
+    return [line.strip() for line in (cell or "").split("\n") if line.strip()]
+
+def collapsed_anchors(cells):
+    """(date column, balance column) of a row whose cells each hold several transactions, or None.
+
+    A row is collapsed when some cell is nothing but two or more dates and
+    a cell to its right is nothing but two or more amounts; the rightmost
+    such amount column is taken as the balance.
+    """
+    lines = [cell_lines(cell) for cell in cells]
+    dates = [i for i, cell in enumerate(lines) if len(cell) > 1 and all(DATE_LINE_PATTERN.fullmatch(line) for line in cell)]
+    amounts = [i for i, cell in enumerate(lines) if len(cell) > 1 and all(AMOUNT_PATTERN.fullmatch(line) for line in cell)]
+    if not dates or not amounts or amounts[-1] <= dates[0]:
+        return None
+    return dates[0], amounts[-1]
+
+def explode_row(words, edges, date_column, balance_column):
+    """Split the words of one collapsed table row into one list of cells per transaction.
+
+    Words are grouped into text lines by position. A line with a date in
+    the date column and an amount in the balance column opens a
+    transaction; every other line (narration and reference continuations)
+    is merged into the transaction above it. Lines above the first anchor
+    come out as a leading row without a date, which the table parsers
+    treat as a continuation of the previous row.
+    """
+    if not words:
+        return []
+    arrays = word_arrays(words)
+    x0, x1, top, bottom, text = arrays
+    lines = cluster_rows(top, bottom)
+    columns = np.clip(assign_columns(x0, x1, edges), 0, len(edges) - 1)
+
+    texts = pd.Series(text, dtype="string")
+    is_date = (columns == date_column) & texts.str.fullmatch(DATE_LINE_PATTERN.pattern).to_numpy(dtype=bool)
+    is_balance = (columns == balance_column) & texts.str.fullmatch(AMOUNT_PATTERN.pattern).to_numpy(dtype=bool)
+
+    line_count = lines.max() + 1
+    anchor = (np.bincount(lines[is_date], minlength=line_count) > 0) & (np.bincount(lines[is_balance], minlength=line_count) > 0)
+    transactions = np.cumsum(anchor)[lines]  # 0 for lines above the first anchor
+    return list(table_rows(arrays, transactions, edges, lines))
+
+def repair_table(page, table, x_tolerance=WORD_X_TOLERANCE):
+    """Extract a pdfplumber table, exploding collapsed rows into one row per transaction.
+
+    Rows that are not collapsed, or whose cells are merged, are returned
+    exactly as table.extract() gives them.
+    """
+    repaired = []
+    for row, cells in zip(table.rows, table.extract()):
+        anchors = collapsed_anchors(cells)
+        if anchors is None or None in row.cells:
+            repaired.append(cells)
+            continue
+        edges = [cell[0] for cell in row.cells]
+        words = page.crop(row.bbox).extract_words(x_tolerance=x_tolerance)
+        repaired.extend(explode_row(words, edges, *anchors) or [cells])
+    return repaired
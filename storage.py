@@ -0,0 +1,40 @@
+"""Where ledgerdaddy keeps its files, and writing them so readers never see a partial one.
+
+    from storage import CACHE_HOME, atomic_path, default_path
+    DEFAULT_CACHE_DIR = default_path("LEDGERDADDY_CACHE_DIR", CACHE_HOME, "parse")
+    with atomic_path(path) as tmp_path:
+        pq.write_table(table, tmp_path)
+"""
+import os
+import uuid
+from contextlib import contextmanager
+
+# Per-user base directories, relative to the home directory
+CACHE_HOME = ".cache"
+DATA_HOME = os.path.join(".local", "share")
+CONFIG_HOME = ".config"
+
+def default_path(env, home, name):
+    """The path in environment variable env, else ~/<home>/ledgerdaddy/<name>."""
+    return os.environ.get(env, os.path.join(os.path.expanduser("~"), home, "ledgerdaddy", name))
+
+@contextmanager
+def atomic_path(path):
+    """A temporary path to write path's new contents to; it replaces path when the block ends without an error.
+
+    The temporary file sits next to path (so the rename stays on one file
+    system) under a unique dot-prefixed name, which directory readers such
+    as pyarrow datasets skip. Missing directories are created.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
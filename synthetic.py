@@ -0,0 +1,187 @@
+import os
+import random
+from datetime import date, timedelta
+
+import fitz  # PyMuPDF
+
+from normalize import format_minor_units
+
+PAGE_WIDTH, PAGE_HEIGHT = 638, 842
+FONT_SIZE = 8
+LINE_HEIGHT = 17.2
+
+COUNTERPARTIES = [
+    "J D ORNAMENTS", "VRAJ JEWELLERS", "SHREE LAKSHMI NARAYANA JEWELLERS", "PAWAN JEWELLERS",
+    "SHREE GANESH ORNAMENTS", "RITESH CHINUBHAI BHATIYA", "VATSAL R BHATIA", "TORRENT POWER",
+]
+IFSC_CODES = ["ICIC0000153", "SNBK0000013", "CIUB0000235", "KKBK0000958", "ICIC0004941"]
+
+def random_transactions(count, seed=0, opening=50000000, start=date(2024, 4, 1)):
+    """Generate ground-truth transactions with a consistent running balance (amounts in paise)."""
+    rng = random.Random(seed)
+    balance = opening
+    day = start
+    transactions = []
+    for i in range(count):
+        day += timedelta(days=rng.choice([0, 0, 1, 2]))
+        party = rng.choice(COUNTERPARTIES)
+        ref = f"N{rng.randrange(10**14, 10**15)}"
+        amount = rng.randrange(100, 30000000)
+        # Withdraw only what the account holds
+        debit = rng.random() < 0.5 and amount <= balance
+        if debit:
+            narration = f"NEFT DR-{rng.choice(IFSC_CODES)}-{party}-NETBANK, MUM-{ref}-{party}"
+            balance -= amount
+        else:
+            narration = f"NEFT CR-{rng.choice(IFSC_CODES)}-{party}-RITESH CHINUBHAI BHATIYA-{ref}"
+            balance += amount
+        transactions.append({
+            "date": day,
+            "narration": narration,
+            "ref": ref,
+            "value_date": day,
+            "withdrawal": amount if debit else 0,
+            "deposit": 0 if debit else amount,
+            "balance": balance,
+        })
+    return transactions, opening
+
+def wrap(text, width):
+    """Split text into chunks of at most width characters, as statements wrap narrations."""
+    return [text[i:i + width] for i in range(0, len(text), width)] or [""]
+
+def put(page, x, y, text, right=False):
+    """Write text with its baseline at y, left-aligned at x or right-aligned to x."""
+    if right:
+        x -= fitz.get_text_length(text, fontname="helv", fontsize=FONT_SIZE)
+    page.insert_text((x, y), text, fontname="helv", fontsize=FONT_SIZE)
+
+def amount_text(value):
+    return format_minor_units(value) if value else ""
+
+def hdfc_page_header(page, number, first_day, last_day):
+    put(page, 292, 25, f"Page No .: {number}")
+    put(page, 340, 58, "Account Branch : RELIEF ROAD")
+    put(page, 40, 180, "M/S. SYNTHETIC TRADERS")
+    put(page, 340, 180, "Account No : 50200061188887 Preferred Customer")
+    put(page, 40, 215, f"From : {first_day:%d/%m/%Y} To : {last_day:%d/%m/%Y} Statement of account")
+
+def write_hdfc_statement(path, transactions, opening):
+    """Lay out an HDFC-style borderless statement: wrapped narrations, footer on every page, summary at the end."""
+    doc = fitz.open()
+    first_day, last_day = transactions[0]["date"], transactions[-1]["date"]
+    footer_y = PAGE_HEIGHT - 60
+    page = None
+    y = footer_y
+
+    def new_page():
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        hdfc_page_header(page, doc.page_count, first_day, last_day)
+        put(page, 40, footer_y + 20, "HDFC BANK LIMITED")
+        return page
+
+    for index, t in enumerate(transactions):
+        lines = wrap(t["narration"], 38)
+        if page is None or y + LINE_HEIGHT * len(lines) > footer_y:
+            page = new_page()
+            y = 240
+            if doc.page_count == 1:
+                put(page, 40, y, "Date")
+                put(page, 153, y, "Narration")
+                put(page, 292, y, "Chq./Ref.No.")
+                put(page, 361, y, "Value Dt")
+                put(page, 405, y, "Withdrawal Amt.")
+                put(page, 491, y, "Deposit Amt.")
+                put(page, 564, y, "Closing Balance")
+                y += LINE_HEIGHT
+
+        put(page, 34, y, f"{t['date']:%d/%m/%y}")
+        put(page, 72, y, lines[0])
+        put(page, 282, y, t["ref"])
+        put(page, 362, y, f"{t['value_date']:%d/%m/%y}")
+        put(page, 466, y, amount_text(t["withdrawal"]), right=True)
+        put(page, 548, y, amount_text(t["deposit"]), right=True)
+        put(page, 627, y, format_minor_units(t["balance"]), right=True)
+        for line in lines[1:]:
+            y += LINE_HEIGHT
+            put(page, 72, y, line)
+        y += LINE_HEIGHT
+
+    # Summary block, on a new page if it does not fit
+    if y + LINE_HEIGHT * 3 > footer_y:
+        page = new_page()
+        y = 240
+    debits = [t["withdrawal"] for t in transactions if t["withdrawal"]]
+    credits = [t["deposit"] for t in transactions if t["deposit"]]
+    put(page, 40, y, "STATEMENT SUMMARY :-")
+    put(page, 40, y + LINE_HEIGHT, "Opening Balance Dr Count Cr Count Debits Credits Closing Bal")
+    put(page, 40, y + 2 * LINE_HEIGHT, " ".join([
+        format_minor_units(opening), str(len(debits)), str(len(credits)),
+        format_minor_units(sum(debits)), format_minor_units(sum(credits)),
+        format_minor_units(transactions[-1]["balance"]),
+    ]))
+    doc.save(path)
+    return doc.page_count
+
+# Canara e-passbook columns as ledgerdaddy.py expects them: (header, left x, right x)
+CANARA_COLUMNS = [
+    ("Date", 20, 80), ("Particulars", 80, 290), ("Chq.No.", 290, 340), ("Withdrawals", 340, 405),
+    ("Deposits", 405, 470), ("Autosweep", 470, 515), ("Reverse\nSweep", 515, 560), ("Balance(INR)", 560, 625),
+]
+
+def write_canara_statement(path, transactions, opening):
+    """Lay out a Canara-style ruled table with the header row repeated on every page."""
+    doc = fitz.open()
+    row_height = 2 * LINE_HEIGHT
+    top, bottom = 80, PAGE_HEIGHT - 40
+    left, right = CANARA_COLUMNS[0][1], CANARA_COLUMNS[-1][2]
+    rows_per_page = int((bottom - top) // row_height) - 1
+
+    for start in range(0, len(transactions), rows_per_page):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        put(page, 20, 40, "Canara Bank e-Passbook")
+        put(page, 20, 55, "Account Number 0429601000251")
+        chunk = transactions[start:start + rows_per_page]
+        cells = [[(header, False) for header, _, _ in CANARA_COLUMNS]]
+        for t in chunk:
+            cells.append([
+                (f"{t['date']:%d-%m-%Y}", False), (t["narration"][:48], False), ("", False),
+                (amount_text(t["withdrawal"]), True), (amount_text(t["deposit"]), True),
+                ("", False), ("", False), (format_minor_units(t["balance"]), True),
+            ])
+
+        # Ruled grid so pdfplumber's default line strategy finds the table
+        table_bottom = top + row_height * len(cells)
+        for i in range(len(cells) + 1):
+            page.draw_line((left, top + i * row_height), (right, top + i * row_height), width=0.5)
+        for _, x0, _ in CANARA_COLUMNS:
+            page.draw_line((x0, top), (x0, table_bottom), width=0.5)
+        page.draw_line((right, top), (right, table_bottom), width=0.5)
+
+        for r, row in enumerate(cells):
+            for (text, align_right), (_, x0, x1) in zip(row, CANARA_COLUMNS):
+                for k, line in enumerate(wrap(text, 24) if not align_right else [text]):
+                    if k < 2:
+                        put(page, x1 - 3 if align_right else x0 + 3, top + r * row_height + 11 + k * 10, line, right=align_right)
+    doc.save(path)
+    return doc.page_count
+
+LAYOUTS = {"hdfc": write_hdfc_statement, "canara": write_canara_statement}
+
+# Rough transactions per page for each layout, used to hit a target page count
+ROWS_PER_PAGE = {"hdfc": 10, "canara": 19}
+
+def generate_statement(directory, layout, pages, seed=0):
+    """Write (or reuse) a synthetic statement of about the given page count.
+
+    Returns (path, page_count, transactions, opening balance). Files are
+    named by layout, size and seed, so repeated runs reuse them.
+    """
+    transactions, opening = random_transactions(max(1, pages * ROWS_PER_PAGE[layout] - 2), seed)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{layout}-{pages}p-{seed}.pdf")
+    if os.path.exists(path):
+        with fitz.open(path) as doc:
+            return path, doc.page_count, transactions, opening
+    page_count = LAYOUTS[layout](path, transactions, opening)
+    return path, page_count, transactions, opening
@@ -2,108 +2,242 @@ import re
 import pandas as pd
 import numpy as np
 from PyPDF2 import PdfReader
-from io import StringIO
+from io import BytesIO, StringIO
 import pdfplumber  # Better tool for spatial analysis of PDF content
+from itertools import chain
+import metrics
+from normalize import column_key, normalize_transactions, transaction_keys
+from document import open_pdf
+from ocr import ocr_pages, pages_needing_ocr
+from planner import DATED_LINE_PATTERN, TABLE_SETTINGS, TablePlanner, is_header_row
+from reconcile import PAGE_COLUMN
+from repair import DATE_LINE_PATTERN
+from records import Transaction, column_positions, row_values, transactions_frame
+from profiles import (AMOUNT_PATTERN, GENERIC, LINE_DATE_PATTERN, STATEMENT_HEADERS,
+                      detect_profile, has_section, iter_section_lines)
 
 def extract_text_from_pdf(pdf_path):
     """Extract text from a PDF file."""
     reader = PdfReader(pdf_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() + "\n"
-    return text
+    return "".join(page.extract_text() + "\n" for page in reader.pages)
+
+# Tighter than pdfplumber's default so words keep their spaces, like PyPDF2's text
+TEXT_X_TOLERANCE = 1.5
+
+def walk_pdf(pdf_path, password=None, ocr=True, dpi=None, pages=None):
+    """Open the PDF once and collect transaction table rows and text from every page.
+
+    pdf_path may also be an open PdfDocument. A TablePlanner picks the
+    table strategy on the first pages and reuses it, so a page normally
+    costs one strategy; all pages' rows come back as a single table,
+    along with the page number (from 1) of each of its rows.
+    Pages without a usable text layer are skipped by pdfplumber and, when
+    ocr is on, sent through the OCR pool instead. Those pages, and pages
+    where no table strategy matches the text, are parsed from their text
+    into (page number, transaction) pairs. pages limits the walk to
+    those page numbers (0-based); of the rest only the first page's header,
+    above its first transaction, is read for the account details.
+    """
+    document = open_pdf(pdf_path, password)
+    try:
+        with metrics.stage("text_layer_check"):
+            scanned = set(pages_needing_ocr(document)) if ocr else set()
+        selected = set(range(document.page_count)) if pages is None else set(pages)
+        scanned &= selected
+        planner = None
+        rows = []
+        row_pages = []
+        page_transactions = []  # From the text of OCR'd pages and pages no strategy could read
+        page_texts = []
+        # The document's bytes are already decrypted, so pdfplumber needs no password
+        with pdfplumber.open(BytesIO(document.data)) as pdf:
+            for number, page in enumerate(pdf.pages):
+                if number not in selected:
+                    page_texts.append(page_header(page) if number == 0 else "")
+                    continue
+                metrics.count("pages")
+                if number in scanned:
+                    page_texts.append("")
+                    continue
+
+                # The text layer serves metadata, the summary, the text fallback and the planner's check
+                with metrics.stage("extract_text", page=number + 1):
+                    text = page.extract_text(x_tolerance=TEXT_X_TOLERANCE) or ""
+                page_texts.append(text)
+
+                # The layout is detected on the first page with text
+                if planner is None:
+                    planner = TablePlanner(detect_profile(text), TEXT_X_TOLERANCE)
+                page_rows = planner.page_rows(page, text)
+                if page_rows is None:
+                    # No table matches the text's transactions; keep the page through its text instead of dropping it
+                    metrics.count("page_text_fallbacks")
+                    page_transactions.extend(iter_page_transactions(number, text, planner.profile))
+                else:
+                    rows.extend(page_rows)
+                    row_pages.extend([number + 1] * len(page_rows))
+                page.close()
+
+        if scanned:
+            options = {"dpi": dpi} if dpi else {}
+            with metrics.stage("ocr"):
+                texts = ocr_pages(document, sorted(scanned), **options)
+            metrics.count("ocr_pages", len(scanned))
+            for number, text in texts.items():
+                page_texts[number] = text
+                # Their transactions are parsed from the OCR text, as tables cannot be found on an image
+                profile = planner.profile if planner is not None else detect_profile(text)
+                page_transactions.extend(iter_page_transactions(number, text, profile))
+    finally:
+        # Only close what was opened here
+        if document is not pdf_path:
+            document.close()
+
+    tables = ([rows], [row_pages]) if rows else ([], [])
+    return (*tables, sorted(page_transactions, key=lambda pair: pair[0])), "\n".join(page_texts)
+
+def iter_page_transactions(number, text, profile):
+    """Yield (page number from 1, transaction) for the transactions in one page's text, cells in STATEMENT_HEADERS order."""
+    for values in iter_text_transactions(text.split("\n"), profile):
+        yield number + 1, values
+
+def page_header(page):
+    """Text of a page above its first dated line."""
+    text = page.extract_text(x_tolerance=TEXT_X_TOLERANCE) or ""
+    match = DATED_LINE_PATTERN.search(text)
+    return text[:match.start()] if match else text
 
 def extract_tables_with_pdfplumber(pdf_path):
     """Extract tables from PDF using pdfplumber which handles borderless tables better."""
-    tables = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            # Extract tables with explicit and implicit borders
-            # For borderless tables, we need to define table settings
-            table_settings = {
-                "vertical_strategy": "text",
-                "horizontal_strategy": "text",
-                "min_words_vertical": 2,
-                "min_words_horizontal": 1,
-                "snap_tolerance": 5,
-                "intersection_tolerance": 3,
-                "edge_min_length": 3,
-                "text_tolerance": 3,
-                "join_tolerance": 3,
-            }
-            
-            # Try to extract tables with the settings
-            page_tables = page.extract_tables(table_settings)
-            if page_tables:
-                tables.extend(page_tables)
-            
-            # If no tables found, try to extract all text and analyze its structure
-            if not page_tables:
-                words = page.extract_words()
-                if words:
-                    # Group words by their vertical position (approximating rows)
-                    y_positions = {}
-                    for word in words:
-                        y_key = round(word['top'] / 10) * 10  # Round to nearest 10 for grouping
-                        if y_key not in y_positions:
-                            y_positions[y_key] = []
-                        y_positions[y_key].append(word)
-                    
-                    # Sort words in each row by horizontal position
-                    for y_key in y_positions:
-                        y_positions[y_key].sort(key=lambda w: w['x0'])
-                    
-                    # Convert to a table format
-                    sorted_y_keys = sorted(y_positions.keys())
-                    text_table = []
-                    for y_key in sorted_y_keys:
-                        row = ' '.join([w['text'] for w in y_positions[y_key]])
-                        text_table.append([row])
-                    
-                    tables.append(text_table)
-    
+    (tables, _, _), _ = walk_pdf(pdf_path)
     return tables
 
-def parse_bank_statement(pdf_path):
-    """Parse bank statement PDF and extract transaction data."""
-    # Try first with pdfplumber for better table extraction
-    tables = extract_tables_with_pdfplumber(pdf_path)
+ACCOUNT_PATTERN = re.compile(r'Account No\s*:\s*(\d+)')
+DATE_RANGE_PATTERN = re.compile(r'From\s*:\s*(\d{2}/\d{2}/\d{4})\s*To\s*:\s*(\d{2}/\d{2}/\d{4})')
+SUMMARY_PATTERN = re.compile(r'Opening Balance\s+Dr Count\s+Cr Count\s+Debits\s+Credits\s+Closing Bal\s+([0-9,.]+)\s+(\d+)\s+(\d+)\s+([0-9,.]+)\s+([0-9,.]+)\s+([0-9,.]+)')
+
+def extract_account_info(text):
+    """Extract the account number and statement date range from statement text."""
+    account_match = ACCOUNT_PATTERN.search(text)
+    account_number = account_match.group(1) if account_match else "Unknown"
+
+    date_range_match = DATE_RANGE_PATTERN.search(text)
+    date_range = f"{date_range_match.group(1)} to {date_range_match.group(2)}" if date_range_match else "Unknown"
+
+    return account_number, date_range
+
+def extract_summary(text):
+    """Extract the statement summary block from statement text."""
+    summary_match = SUMMARY_PATTERN.search(text)
+
+    if not summary_match:
+        return None
+
+    return {
+        "Opening Balance": summary_match.group(1),
+        "Debit Count": summary_match.group(2),
+        "Credit Count": summary_match.group(3),
+        "Total Debits": summary_match.group(4),
+        "Total Credits": summary_match.group(5),
+        "Closing Balance": summary_match.group(6)
+    }
+
+def parse_bank_statement(pdf_path, password=None, pages=None):
+    """Parse bank statement PDF and extract transaction data, from only the given pages (0-based) if pages is set."""
+    # Walk the document once; tables and text both come from the same pass
+    (tables, table_pages, page_transactions), text = walk_pdf(pdf_path, password, pages=pages)
     
     # If pdfplumber found tables, process them
     if tables and any(table for table in tables if len(table) > 1):
-        return process_extracted_tables(tables, pdf_path)
-    
-    # Fallback to text-based extraction
-    text = extract_text_from_pdf(pdf_path)
-    return parse_bank_statement_from_text(text)
+        with metrics.stage("table_parse"):
+            result = process_extracted_tables(tables, text, table_pages, page_transactions)
+    else:
+        # Fallback to text-based extraction
+        metrics.count("text_fallbacks")
+        with metrics.stage("regex_parse"):
+            result = parse_bank_statement_from_text(text)
+    metrics.count("rows", 0 if result[0] is None else len(result[0]))
+    return result
+
+def is_blank_row(row):
+    return not row or not any(cell for cell in row)
+
+def clean_table_rows(table):
+    """Yield the non-empty rows of a table with cells stripped and None as ""."""
+    for row in table:
+        if not is_blank_row(row):
+            # Remove empty cells and strip whitespace
+            yield [str(cell).strip() if cell else "" for cell in row]
 
-def process_extracted_tables(tables, pdf_path):
-    """Process tables extracted by pdfplumber."""
+def has_date(cell):
+    """Whether a table cell holds a date in any layout's form, DD/MM/YY through DD-MM-YYYY."""
+    return bool(DATE_LINE_PATTERN.search(cell))
+
+def starts_transaction(row):
+    """Whether a cleaned table row opens a transaction, rather than continuing one: it contains a date."""
+    return any(has_date(cell) for cell in row)
+
+def iter_table_transactions(rows, headers):
+    """Yield transactions from cleaned table rows, merging continuation rows into the narration.
+
+    Each transaction is a list of cells, one per column of
+    column_positions(headers). Only the open transaction is held between
+    rows; its continuation lines are joined onto the narration once it is
+    complete.
+    """
+    columns, positions = column_positions(headers)
+    narration = columns.index("Narration") if "Narration" in columns else None
+    current_transaction = None
+
+    for row in rows:
+        # Check if this row starts a new transaction (contains a date)
+        if starts_transaction(row):
+            # The previous transaction is complete
+            if current_transaction is not None:
+                yield current_transaction.finish(narration)
+            current_transaction = Transaction(row_values(row, positions))
+        elif current_transaction is not None and narration is not None:
+            # This is a continuation of the previous transaction
+            # Usually these are continuations of the narration
+            current_transaction.extend(" ".join(cell for cell in row if cell))
+
+    # Emit the last transaction
+    if current_transaction is not None:
+        yield current_transaction.finish(narration)
+
+def process_extracted_tables(tables, text, pages=None, page_transactions=None):
+    """Process tables extracted by pdfplumber, using the page text for metadata.
+
+    pages, one list per table with each row's page number, adds a Page
+    column giving the page each transaction starts on. page_transactions,
+    (page number, transaction) pairs parsed from the text of pages the
+    tables miss, are merged in page order.
+    """
     # Identify the transaction table
     transaction_table = None
-    for table in tables:
+    transaction_pages = None
+    for i, table in enumerate(tables):
         # Look for tables with date patterns or header rows that look like transaction data
-        if any(cell and isinstance(cell, str) and re.search(r'\d{2}/\d{2}/\d{2}', cell) for row in table for cell in row):
+        if any(cell and isinstance(cell, str) and has_date(cell) for row in table for cell in row):
             transaction_table = table
+            transaction_pages = pages[i] if pages else None
             break
     
     if not transaction_table:
         print("No transaction table found. Falling back to text extraction.")
-        return parse_bank_statement_from_text(extract_text_from_pdf(pdf_path))
+        return parse_bank_statement_from_text(text)
     
     # Clean and process the transaction table
     # Remove empty rows and columns
-    cleaned_table = []
-    for row in transaction_table:
-        if row and any(cell for cell in row):
-            # Remove empty cells and strip whitespace
-            cleaned_row = [str(cell).strip() if cell else "" for cell in row]
-            cleaned_table.append(cleaned_row)
+    cleaned_table = list(clean_table_rows(transaction_table))
+    if transaction_pages is not None:
+        # Pages of the kept rows, in step with cleaned_table
+        transaction_pages = [page for row, page in zip(transaction_table, transaction_pages) if not is_blank_row(row)]
     
     # Determine if the first row is a header row
     header_row = None
     for i, row in enumerate(cleaned_table):
-        if any(header in ' '.join(row).upper() for header in ["DATE", "NARRATION", "AMOUNT", "BALANCE"]):
+        if is_header_row(row):
             header_row = i
             break
     
@@ -111,12 +245,13 @@ def process_extracted_tables(tables, pdf_path):
     if header_row is not None:
         headers = cleaned_table[header_row]
         data_rows = cleaned_table[header_row+1:]
+        data_pages = transaction_pages and transaction_pages[header_row+1:]
     else:
         # Infer headers based on typical bank statement columns
         date_col = -1
         for i, row in enumerate(cleaned_table):
             for j, cell in enumerate(row):
-                if re.search(r'\d{2}/\d{2}/\d{2}', cell):
+                if has_date(cell):
                     date_col = j
                     break
             if date_col >= 0:
@@ -124,225 +259,217 @@ def process_extracted_tables(tables, pdf_path):
         
         if date_col >= 0:
             # Assume a basic structure with date followed by description and amounts
-            headers = ["Date", "Narration", "Chq./Ref.No.", "Value Dt", "Withdrawal Amt.", "Deposit Amt.", "Closing Balance"]
-            data_rows = [row for row in cleaned_table if any(re.search(r'\d{2}/\d{2}/\d{2}', cell) for cell in row)]
+            headers = STATEMENT_HEADERS
+            data_rows = [row for row in cleaned_table if starts_transaction(row)]
+            data_pages = transaction_pages and [page for row, page in zip(cleaned_table, transaction_pages)
+                                                if starts_transaction(row)]
         else:
             print("Could not determine table structure.")
             return None, None, None, None
     
     # Process transactions with awareness of multiline entries
-    transactions = []
-    current_transaction = None
+    columns, _ = column_positions(headers)
+    transactions = list(iter_table_transactions(data_rows, headers))
     
-    for row in data_rows:
-        # Check if this row starts a new transaction (contains a date)
-        has_date = any(re.search(r'\d{2}/\d{2}/\d{2}', cell) for cell in row)
-        
-        if has_date:
-            # Add previous transaction if exists
-            if current_transaction:
-                transactions.append(current_transaction)
-            
-            # Start a new transaction
-            # Map row data to appropriate columns
-            current_transaction = {}
-            for i, header in enumerate(headers):
-                if i < len(row):
-                    current_transaction[header] = row[i]
-                else:
-                    current_transaction[header] = ""
-        elif current_transaction:
-            # This is a continuation of the previous transaction
-            # Usually these are continuations of the narration
-            narration_ext = " ".join(cell for cell in row if cell)
-            if "Narration" in current_transaction:
-                current_transaction["Narration"] += " " + narration_ext
-    
-    # Add the last transaction
-    if current_transaction:
-        transactions.append(current_transaction)
-    
-    # Extract account information from PDF text
-    text = extract_text_from_pdf(pdf_path)
-    account_match = re.search(r'Account No\s*:\s*(\d+)', text)
-    account_number = account_match.group(1) if account_match else "Unknown"
-    
-    date_range_match = re.search(r'From\s*:\s*(\d{2}/\d{2}/\d{4})\s*To\s*:\s*(\d{2}/\d{2}/\d{4})', text)
-    date_range = f"{date_range_match.group(1)} to {date_range_match.group(2)}" if date_range_match else "Unknown"
-    
-    # Extract summary
-    summary_match = re.search(r'Opening Balance\s+Dr Count\s+Cr Count\s+Debits\s+Credits\s+Closing Bal\s+([0-9,.]+)\s+(\d+)\s+(\d+)\s+([0-9,.]+)\s+([0-9,.]+)\s+([0-9,.]+)', text)
-    
-    if summary_match:
-        summary = {
-            "Opening Balance": summary_match.group(1),
-            "Debit Count": summary_match.group(2),
-            "Credit Count": summary_match.group(3),
-            "Total Debits": summary_match.group(4),
-            "Total Credits": summary_match.group(5),
-            "Closing Balance": summary_match.group(6)
-        }
-    else:
-        summary = None
+    # Extract account information and summary from the text of the same pass
+    account_number, date_range = extract_account_info(text)
+    summary = extract_summary(text)
     
     # Create DataFrame
-    df = pd.DataFrame(transactions)
+    df = transactions_frame(transactions, columns)
+    if data_pages is not None and PAGE_COLUMN not in df.columns:
+        df[PAGE_COLUMN] = np.array([page for row, page in zip(data_rows, data_pages) if starts_transaction(row)], dtype=np.int64)
+    if page_transactions:
+        df = merge_page_transactions(df, page_transactions)
     
     return df, account_number, date_range, summary
 
+def merge_page_transactions(df, page_transactions):
+    """Add (page number, transaction) pairs from page text to a table frame, keeping rows in page order.
+
+    The text's STATEMENT_HEADERS columns take the name of the table column
+    with the same column_key, so "Value Dt" lands in "ValueDt". With df
+    None the text's transactions make the frame on their own.
+    """
+    names = {} if df is None else {column_key(column): column for column in df.columns}
+    text_df = transactions_frame([values for _, values in page_transactions],
+                                 [names.get(column_key(header), header) for header in STATEMENT_HEADERS])
+    text_df[PAGE_COLUMN] = np.array([page for page, _ in page_transactions], dtype=np.int64)
+    if df is None:
+        return text_df
+    df = pd.concat([df, text_df], ignore_index=True)
+    if PAGE_COLUMN in names.values():
+        # A stable sort keeps the rows of each page in the order they were read
+        df = df.sort_values(PAGE_COLUMN, kind="stable", ignore_index=True)
+    return df
+
+# Where parse_transaction_line puts the narration
+TEXT_NARRATION = STATEMENT_HEADERS.index("Narration")
+
+def parse_transaction_line(line, profile=GENERIC):
+    """Parse a text line that starts with a date into a list of cells in STATEMENT_HEADERS order, or None if it is too short."""
+    # Extract data using the profile's precompiled transaction pattern
+    transaction_match = profile["transaction"].search(line) if profile["transaction"] else None
+
+    if transaction_match:
+        date = transaction_match.group(1)
+        narration = transaction_match.group(2).strip()
+        ref_no = transaction_match.group(3)
+        value_dt = transaction_match.group(4)
+        withdrawal = transaction_match.group(5) or ""
+        deposit = transaction_match.group(6) or ""
+        closing_balance = transaction_match.group(7)
+
+        return [date, narration, ref_no, value_dt, withdrawal, deposit, closing_balance]
+
+    # If regex doesn't match but line starts with date, try to extract data by position
+    parts = line.split()
+    if len(parts) < 5:
+        return None
+
+    date = parts[0]
+    # Complex logic to determine which parts are which
+    closing_balance = parts[-1]
+
+    # Check if second-to-last part is a number with commas and decimals
+    if AMOUNT_PATTERN.match(parts[-2]):
+        if AMOUNT_PATTERN.match(parts[-3]):
+            # Both withdrawal and deposit are present
+            deposit = parts[-2]
+            withdrawal = parts[-3]
+            ref_no = parts[-4]
+            value_dt = parts[-5]
+            narration = ' '.join(parts[1:-5])
+        else:
+            # Only one of withdrawal or deposit is present
+            amount = parts[-2]
+            ref_no = parts[-3]
+            value_dt = parts[-4]
+            narration = ' '.join(parts[1:-4])
+
+            # Determine if it's withdrawal or deposit based on narration
+            if any(marker in narration for marker in profile["debit_markers"]):
+                withdrawal = amount
+                deposit = ""
+            else:
+                withdrawal = ""
+                deposit = amount
+    else:
+        # Unusual format, try best effort parsing
+        narration = ' '.join(parts[1:])
+        ref_no = ""
+        value_dt = ""
+        withdrawal = ""
+        deposit = ""
+
+    return [date, narration, ref_no, value_dt, withdrawal, deposit, closing_balance]
+
+def iter_text_transactions(lines, profile=GENERIC):
+    """Yield transactions from statement text lines, as lists of cells in STATEMENT_HEADERS order, as soon as each one is complete.
+
+    Only the open transaction is held between lines, so lines can be fed
+    page by page and a narration may continue onto the next page. Lines
+    outside the profile's start and stop markers are ignored.
+    """
+    current_transaction = None
+
+    for line in iter_section_lines(lines, profile):
+        # Skip empty lines
+        if not line.strip():
+            continue
+
+        # Check if line starts with date pattern (DD/MM/YY)
+        if LINE_DATE_PATTERN.match(line):
+            values = parse_transaction_line(line, profile)
+            if values:
+                # The previous transaction is complete
+                if current_transaction is not None:
+                    yield current_transaction.finish(TEXT_NARRATION)
+                current_transaction = Transaction(values)
+                continue
+
+        if current_transaction is not None:
+            # This line is a continuation of the narration for the current transaction
+            current_transaction.extend(line.strip())
+
+    # Emit the last transaction if there is one
+    if current_transaction is not None:
+        yield current_transaction.finish(TEXT_NARRATION)
+
 def parse_bank_statement_from_text(text):
     """Fallback method to parse bank statement from extracted text."""
     # This is the original text-based parsing logic
     # Extract account details
-    account_match = re.search(r'Account No\s*:\s*(\d+)', text)
-    account_number = account_match.group(1) if account_match else "Unknown"
-    
-    date_range_match = re.search(r'From\s*:\s*(\d{2}/\d{2}/\d{4})\s*To\s*:\s*(\d{2}/\d{2}/\d{4})', text)
-    date_range = f"{date_range_match.group(1)} to {date_range_match.group(2)}" if date_range_match else "Unknown"
-    
-    # Find the start of transaction data
-    headers = ["Date", "Narration", "Chq./Ref.No.", "Value Dt", "Withdrawal Amt.", "Deposit Amt.", "Closing Balance"]
+    account_number, date_range = extract_account_info(text)
     
     # Split text into lines
     lines = text.split('\n')
     
-    # Find where transactions begin
-    transaction_start = -1
-    for i, line in enumerate(lines):
-        if line.strip().startswith("Date") and "Narration" in line and "Closing Balance" in line:
-            transaction_start = i + 1
-            break
-    
-    if transaction_start == -1:
+    # Pick the bank layout and check that its transactions begin somewhere
+    profile = detect_profile(text)
+    if not has_section(lines, profile):
         return None, None, None, None
     
     # Extract transaction data
-    transactions = []
-    current_transaction = None
-    
-    for line in lines[transaction_start:]:
-        # Skip empty lines
-        if not line.strip():
-            continue
-            
-        # Check if line starts with date pattern (DD/MM/YY)
-        date_match = re.match(r'(\d{2}/\d{2}/\d{2})\s', line)
-        
-        if date_match:
-            # If there's a current transaction, add it to the list
-            if current_transaction:
-                transactions.append(current_transaction)
-            
-            # Extract data using regex
-            # This regex tries to capture the pattern of transactions in the PDF
-            transaction_match = re.search(
-                r'(\d{2}/\d{2}/\d{2})\s+(.*?)\s+([A-Z0-9]+\d{2,})\s+(\d{2}/\d{2}/\d{2})\s+(\d{1,3}(?:,\d{3})*\.\d{2})?\s+(\d{1,3}(?:,\d{3})*\.\d{2})?\s+(\d{1,3}(?:,\d{3})*\.\d{2})',
-                line
-            )
-            
-            if transaction_match:
-                date = transaction_match.group(1)
-                narration = transaction_match.group(2).strip()
-                ref_no = transaction_match.group(3)
-                value_dt = transaction_match.group(4)
-                withdrawal = transaction_match.group(5) or ""
-                deposit = transaction_match.group(6) or ""
-                closing_balance = transaction_match.group(7)
-                
-                current_transaction = {
-                    "Date": date,
-                    "Narration": narration,
-                    "Chq./Ref.No.": ref_no,
-                    "Value Dt": value_dt,
-                    "Withdrawal Amt.": withdrawal,
-                    "Deposit Amt.": deposit,
-                    "Closing Balance": closing_balance
-                }
-            else:
-                # If regex doesn't match but line starts with date, try to extract data by position
-                parts = line.split()
-                if len(parts) >= 5:
-                    date = parts[0]
-                    # Complex logic to determine which parts are which
-                    closing_balance = parts[-1]
-                    
-                    # Check if second-to-last part is a number with commas and decimals
-                    if re.match(r'\d{1,3}(?:,\d{3})*\.\d{2}', parts[-2]):
-                        if re.match(r'\d{1,3}(?:,\d{3})*\.\d{2}', parts[-3]):
-                            # Both withdrawal and deposit are present
-                            deposit = parts[-2]
-                            withdrawal = parts[-3]
-                            ref_no = parts[-4]
-                            value_dt = parts[-5]
-                            narration = ' '.join(parts[1:-5])
-                        else:
-                            # Only one of withdrawal or deposit is present
-                            amount = parts[-2]
-                            ref_no = parts[-3]
-                            value_dt = parts[-4]
-                            narration = ' '.join(parts[1:-4])
-                            
-                            # Determine if it's withdrawal or deposit based on narration
-                            if "DR-" in narration or "BILLPA" in narration:
-                                withdrawal = amount
-                                deposit = ""
-                            else:
-                                withdrawal = ""
-                                deposit = amount
-                    else:
-                        # Unusual format, try best effort parsing
-                        narration = ' '.join(parts[1:])
-                        ref_no = ""
-                        value_dt = ""
-                        withdrawal = ""
-                        deposit = ""
-                    
-                    current_transaction = {
-                        "Date": date,
-                        "Narration": narration,
-                        "Chq./Ref.No.": ref_no,
-                        "Value Dt": value_dt,
-                        "Withdrawal Amt.": withdrawal,
-                        "Deposit Amt.": deposit,
-                        "Closing Balance": closing_balance
-                    }
-        elif "STATEMENT SUMMARY" in line:
-            # We've reached the end of transactions
-            if current_transaction:
-                transactions.append(current_transaction)
-            break
-        elif current_transaction:
-            # This line is a continuation of the narration for the current transaction
-            current_transaction["Narration"] += " " + line.strip()
-    
-    # Add the last transaction if there is one
-    if current_transaction and current_transaction not in transactions:
-        transactions.append(current_transaction)
+    transactions = list(iter_text_transactions(lines, profile))
     
     # Extract summary information
-    summary_match = re.search(r'Opening Balance\s+Dr Count\s+Cr Count\s+Debits\s+Credits\s+Closing Bal\s+([0-9,.]+)\s+(\d+)\s+(\d+)\s+([0-9,.]+)\s+([0-9,.]+)\s+([0-9,.]+)', text)
-    
-    if summary_match:
-        summary = {
-            "Opening Balance": summary_match.group(1),
-            "Debit Count": summary_match.group(2),
-            "Credit Count": summary_match.group(3),
-            "Total Debits": summary_match.group(4),
-            "Total Credits": summary_match.group(5),
-            "Closing Balance": summary_match.group(6)
-        }
-    else:
-        summary = None
+    summary = extract_summary(text)
     
     # Create DataFrame
-    df = pd.DataFrame(transactions)
+    df = transactions_frame(transactions, STATEMENT_HEADERS)
     
     return df, account_number, date_range, summary
 
+def iter_page_texts(pdf_path):
+    """Yield the text of each page, releasing each page's objects once it is read."""
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            text = page.extract_text(x_tolerance=TEXT_X_TOLERANCE) or ""
+            page.close()
+            yield text
+
+def iter_page_table_rows(pdf_path):
+    """Yield cleaned table rows one page at a time, releasing each page's objects once it is read."""
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            page_tables = page.extract_tables(TABLE_SETTINGS)
+            page.close()
+            for table in page_tables:
+                yield from clean_table_rows(table)
+
+def iter_bank_statement(pdf_path, use_tables=False):
+    """Stream transactions from a statement PDF page by page.
+
+    Returns (columns, transactions): transactions yields each one as a
+    list of cells in columns order as soon as the page holding it has
+    been parsed; transactions_frame(list(transactions), columns) makes
+    the DataFrame. By default the text layer is parsed with the layout
+    profile detected on the first page; with use_tables the pdfplumber
+    tables are used instead, with the header taken from the first header
+    row.
+    """
+    if use_tables:
+        rows = iter_page_table_rows(pdf_path)
+        headers = next((row for row in rows if is_header_row(row)), None)
+        if headers is None:
+            return [], iter(())
+        return column_positions(headers)[0], iter_table_transactions(rows, headers)
+
+    # The layout is detected from the first page, then every page is fed through it
+    pages = iter_page_texts(pdf_path)
+    first_page = next(pages, "")
+    profile = detect_profile(first_page)
+    lines = (line for text in chain([first_page], pages) for line in text.split("\n"))
+    return STATEMENT_HEADERS, iter_text_transactions(lines, profile)
+
 def clean_transaction_data(df):
     """Clean and format the transaction data."""
     if df is None or df.empty:
         return None
     
-    # Remove any duplicated rows
-    df = df.drop_duplic
\ No newline at end of file
+    # Amounts to integer paise and dates to datetime64 in one vectorized pass
+    df = normalize_transactions(df)
+
+    # Remove duplicated transactions by their hashed key instead of comparing whole rows
+    return df[~transaction_keys(df).duplicated()]
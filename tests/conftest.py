@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# The modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from normalize import normalize_transactions
+from profiles import STATEMENT_HEADERS
+
+def statement_frame(rows):
+    """A normalized statement frame from [date, narration, ref, withdrawal, deposit, balance] rows as printed."""
+    raw = pd.DataFrame([[date, narration, ref, date, withdrawal, deposit, balance]
+                        for date, narration, ref, withdrawal, deposit, balance in rows], columns=STATEMENT_HEADERS)
+    return normalize_transactions(raw)
+
+@pytest.fixture
+def statement():
+    """Three HDFC-style rows that reconcile from an opening balance of 10,000.00."""
+    return statement_frame([
+        ["01/04/24", "UPI-VRAJ JEWELLERS-PAYMENT", "0000401", "", "1,000.00", "11,000.00"],
+        ["02/04/24", "NEFT DR-TORRENT POWER", "0000402", "250.50", "", "10,749.50"],
+        ["03/04/24", "ATM CASH WDL", "0000403", "749.50", "", "10,000.00"],
+    ])
+
+@pytest.fixture
+def empty_statement(statement):
+    return statement.iloc[:0]
@@ -0,0 +1,32 @@
+import re
+
+import pytest
+
+from categories import COUNTERPARTY_COLUMN, UNKNOWN, RuleSet, counterparty_ledgers, trie_pattern
+
+def test_trie_pattern_prefers_the_longer_word():
+    pattern = re.compile(trie_pattern(["VRAJ", "VRAJJEWEL", "TORRENT"]))
+    assert pattern.match("VRAJJEWELLERS").group() == "VRAJJEWEL"
+    assert pattern.match("VRAJ123").group() == "VRAJ"
+    assert pattern.match("TORR") is None
+
+def test_rule_set_matches_names_then_patterns():
+    rules = RuleSet({"Vraj": ["vraj jewellers"], "Power": ["re:TORRENT ?POWER"], "Jewellery": ["re:JEWEL"]})
+    narrations = ["UPI-VRAJ JEWELLERS-PAYMENT", "NEFT DR-TORRENTPOWER", "NEFT-PAWAN JEWELLERS", "ATM CASH WDL", None]
+    assert rules.match(narrations).tolist() == ["Vraj", "Power", "Jewellery", None, None]
+
+def test_invalid_pattern_is_a_value_error():
+    with pytest.raises(ValueError, match="Broken"):
+        RuleSet({"Broken": ["re:("]})
+
+def test_counterparty_ledgers(statement):
+    ledger, totals = counterparty_ledgers(statement, RuleSet({"Power": ["re:TORRENT"]}), fallback=False)
+    parties = dict(zip(ledger["Narration"], ledger[COUNTERPARTY_COLUMN]))
+    assert parties["NEFT DR-TORRENT POWER"] == "Power"
+    assert parties["ATM CASH WDL"] == UNKNOWN
+    assert totals.loc["Power", "withdrawals"] == 25050
+    assert totals.loc[UNKNOWN, "deposits"] == 100000
+
+def test_counterparty_ledgers_of_an_empty_frame(empty_statement):
+    ledger, totals = counterparty_ledgers(empty_statement, {"Power": ["re:TORRENT"]})
+    assert ledger.empty and totals.empty
@@ -0,0 +1,29 @@
+import csv
+
+import pyarrow.parquet as pq
+from decimal import Decimal
+
+from export import amount_columns, write_table
+
+def test_amount_columns(statement):
+    assert amount_columns(statement) == ["Withdrawal Amt.", "Deposit Amt.", "Closing Balance"]
+
+def test_csv_amounts_are_exact_rupees(statement, tmp_path):
+    path = tmp_path / "ledger.csv"
+    assert write_table(statement, str(path), chunk_rows=2) == 3
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["Withdrawal Amt."] for row in rows] == ["0.00", "250.50", "749.50"]
+    assert rows[0]["Closing Balance"] == "11000.00"
+
+def test_parquet_amounts_are_decimals(statement, tmp_path):
+    path = tmp_path / "ledger.parquet"
+    write_table([statement.iloc[:1], statement.iloc[1:]], str(path))
+    table = pq.read_table(path)
+    assert table.column("Deposit Amt.").to_pylist() == [Decimal("1000.00"), Decimal("0.00"), Decimal("0.00")]
+
+def test_empty_frame(empty_statement, tmp_path):
+    path = tmp_path / "ledger.csv"
+    assert write_table(empty_statement, str(path)) == 0
+    with open(path, newline="") as f:
+        assert next(csv.reader(f)) == list(empty_statement.columns)
@@ -0,0 +1,34 @@
+import pandas as pd
+
+from normalize import detect_columns, format_minor_units, to_datetime, to_minor_units, transaction_keys
+
+def test_to_minor_units():
+    values = pd.Series(["1,23,456.7", "₹ 5", "-0.05", "12.00Dr", "", None, "abc"])
+    assert to_minor_units(values).tolist()[:4] == [12345670, 500, -5, -1200]
+    assert to_minor_units(values).isna().tolist()[4:] == [True, True, True]
+    assert to_minor_units(values, fill=0).tolist()[4:] == [0, 0, 0]
+
+def test_to_datetime_accepts_short_and_long_years():
+    dates = to_datetime(pd.Series(["01/04/24", "01-04-2024", "2024-04-01"]))
+    assert dates.iloc[0] == dates.iloc[1] == pd.Timestamp("2024-04-01")
+    assert pd.isna(dates.iloc[2])
+
+def test_format_minor_units():
+    assert [format_minor_units(v) for v in (123456, -5, 0)] == ["1,234.56", "-0.05", "0.00"]
+
+def test_normalize_transactions(statement):
+    withdrawal, deposit, balance = detect_columns(statement)
+    assert statement[withdrawal].tolist() == [0, 25050, 74950]
+    assert statement[deposit].tolist() == [100000, 0, 0]
+    assert statement[balance].tolist() == [1100000, 1074950, 1000000]
+    assert pd.api.types.is_datetime64_any_dtype(statement["Date"])
+
+def test_transaction_keys_ignore_the_date_unit(statement):
+    keys = transaction_keys(statement)
+    seconds = statement.assign(Date=statement["Date"].astype("datetime64[s]"))
+    nanoseconds = statement.assign(Date=statement["Date"].astype("datetime64[ns]"))
+    assert keys.dtype == "uint64" and keys.is_unique
+    assert keys.tolist() == transaction_keys(seconds).tolist() == transaction_keys(nanoseconds).tolist()
+
+def test_transaction_keys_of_an_empty_frame(empty_statement):
+    assert len(transaction_keys(empty_statement)) == 0
@@ -0,0 +1,31 @@
+from normalize import detect_columns
+from reconcile import reconcile
+
+def test_balanced_statement(statement):
+    fixed, swapped, breaks = reconcile(statement, opening=1000000)
+    assert len(swapped) == 0 and breaks.empty
+    assert fixed.equals(statement)
+
+def test_swapped_sides_are_fixed(statement):
+    withdrawal, deposit, _ = detect_columns(statement)
+    wrong = statement.copy()
+    wrong.loc[1, [withdrawal, deposit]] = [0, 25050]
+    fixed, swapped, breaks = reconcile(wrong)
+    assert swapped.tolist() == [1] and breaks.empty
+    assert fixed[withdrawal].tolist() == statement[withdrawal].tolist()
+
+def test_break_is_reported(statement):
+    _, _, balance = detect_columns(statement)
+    broken = statement.copy()
+    broken.loc[2, balance] = 990000
+    _, _, breaks = reconcile(broken)
+    assert breaks["row"].tolist() == [2]
+    assert breaks["difference"].tolist() == [-10000]
+
+def test_newest_first_statement(statement):
+    _, swapped, breaks = reconcile(statement.iloc[::-1].reset_index(drop=True))
+    assert len(swapped) == 0 and breaks.empty
+
+def test_empty_statement(empty_statement):
+    fixed, swapped, breaks = reconcile(empty_statement, opening=1000000)
+    assert fixed.empty and len(swapped) == 0 and breaks.empty
@@ -0,0 +1,24 @@
+from repair import collapsed_anchors, explode_row
+
+def word(text, x0, top):
+    return {"text": text, "x0": x0, "x1": x0 + 5 * len(text), "top": top, "bottom": top + 8}
+
+def test_collapsed_anchors():
+    collapsed = ["01/04/24\n02/04/24", "UPI-VRAJ\nNEFT DR", "", "1,000.00\n250.50", "11,000.00\n10,749.50"]
+    assert collapsed_anchors(collapsed) == (0, 4)
+    assert collapsed_anchors(["01/04/24", "UPI-VRAJ", "1,000.00", "11,000.00"]) is None
+
+def test_explode_row():
+    edges = [0, 60, 200, 300]
+    words = [
+        word("01/04/24", 5, 10), word("UPI-VRAJ", 65, 10), word("1,000.00", 205, 10), word("11,000.00", 305, 10),
+        word("JEWELLERS", 65, 20),
+        word("02-04-2024", 5, 30), word("NEFT", 65, 30), word("250.50", 205, 30), word("10,749.50", 305, 30),
+    ]
+    rows = explode_row(words, edges, 0, 3)
+    assert [row[0] for row in rows] == ["01/04/24", "02-04-2024"]
+    assert "JEWELLERS" in rows[0][1]
+    assert [row[3] for row in rows] == ["11,000.00", "10,749.50"]
+
+def test_explode_row_without_words():
+    assert explode_row([], [0, 60], 0, 1) == []
@@ -1,78 +1,99 @@
+import numpy as np
 import pdfplumber
-import re
+from layout import cluster_rows, header_edges, table_rows, word_arrays
+from normalize import column_key
+from profiles import DATE_PATTERN, DATE_TOKEN_PATTERN, detect_profile, iter_section_lines
+from records import Transaction
+
+def find_header_edges(arrays, rows, profile):
+    """Column edges from the first row that matches the profile's start marker, or None."""
+    x0, x1, _, _, text = arrays
+    # One sort puts words in row and reading order; the rows are then slices of it
+    order = np.lexsort((x0, rows))
+    breaks = np.flatnonzero(np.diff(rows[order])) + 1
+    for in_row in np.split(order, breaks) if len(order) else []:
+        if profile["start"].search(" ".join(text[in_row])):
+            return header_edges(x0[in_row], x1[in_row])
+    return None
+
+def iter_page_rows(pdf, profile):
+    """Yield every page's rows as lists of cells, split by the profile's column edges."""
+    edges = profile["columns"]
+    for page in pdf.pages:
+        arrays = word_arrays(page.extract_words())  # Extract words with positions
+        page.close()
+        rows = cluster_rows(arrays[2], arrays[3])  # Group words into rows by their tops
+
+        # Layouts without declared columns take them from the header row
+        if edges is None:
+            edges = find_header_edges(arrays, rows, profile)
+            if edges is None:
+                continue
+        yield from table_rows(arrays, rows, edges)
+
+def track_header(rows, profile, header):
+    """Pass rows through, copying the first one that matches the profile's start marker into header."""
+    for cells in rows:
+        if not header and profile["start"].search(" ".join(cells)):
+            header.extend(cells)
+        yield cells
+
+def field_positions(headers, profile):
+    """Positions of the narration, withdrawal, deposit and value date columns in headers, None for any missing."""
+    keys = [column_key(header) for header in headers]
+    names = (profile["narration"], profile["withdrawal"], profile["deposit"], "Value Dt")
+    return [keys.index(column_key(name)) if column_key(name) in keys else None for name in names]
 
 def extract_bank_statement(pdf_path):
     extracted_data = []
     current_entry = None
-    start_extracting = False  # Flag to start processing after "Closing Balance"
 
     with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            words = page.extract_words()  # Extract words with positions
-            rows = {}
-
-            for word in words:
-                text, x, y = word['text'], word['x0'], word['top']
-
-                # Start extraction only after "Closing Balance"
-                if "Closing Balance" in text:
-                    start_extracting = True
-                    continue
-
-                if not start_extracting:
-                    continue
-
-                # Group words by similar y-coordinates (same row)
-                row_key = round(y, 1)  # Use rounded 'y' value to group words in the same line
-                if row_key not in rows:
-                    rows[row_key] = []
-                rows[row_key].append((text, x))  # Store text along with x position
-
-            # Sort rows by their y-coordinates
-            sorted_rows = sorted(rows.items())
-
-            for y, words in sorted_rows:
-                words = sorted(words, key=lambda w: w[1])  # Sort words by x-coordinates (left to right)
-                line_text = " ".join([w[0] for w in words])  # Recreate structured line
-
-                # Detect transaction date (DD/MM/YY format)
-                date_match = re.match(r"(\d{2}/\d{2}/\d{2})", line_text)
-
-                if date_match:
-                    # Save previous entry before starting a new one
-                    if current_entry:
-                        extracted_data.append(current_entry)
-
-                    parts = line_text.split()
-                    transaction_date = parts[0]  # First column (Transaction Date)
-
-                    # Detect last part as the Posting Date (4th column)
-                    posting_date = parts[-1] if re.match(r"\d{2}/\d{2}/\d{2}", parts[-1]) else ""
-
-                    # Extract amount (should be before posting_date)
-                    amount = ""
-                    for i in range(len(parts) - 2, 0, -1):
-                        if re.match(r"[\d,]+\.\d{2}", parts[i]):  # Look for a valid amount format
-                            amount = parts[i]
-                            description = " ".join(parts[1:i])  # Everything between Date and Amount
-                            break
-                    else:
-                        description = " ".join(parts[1:])  # If no amount is found, assume all is description
-
-                    # Create a new row entry
-                    current_entry = [transaction_date, description, amount, posting_date]
-
-                else:
-                    # If no date, it's a continuation of the previous description
-                    if current_entry:
-                        current_entry[1] += " " + line_text.strip()  # Append to description column
+        if not pdf.pages:
+            return extracted_data
+
+        # Detect the bank layout from the first page; its markers decide where transactions start and stop
+        profile = detect_profile(pdf.pages[0].extract_text() or "")
+        # Layouts without header names take them from the header row, which precedes every transaction
+        headers = profile["headers"] or []
+        rows = iter_section_lines(track_header(iter_page_rows(pdf, profile), profile, headers), profile, key=" ".join)
+        positions = None
+
+        for cells in rows:
+            if positions is None:
+                # Column positions of the fields, from the header names
+                narration, withdrawal, deposit, posting = positions = field_positions(headers, profile)
+                if narration is None or withdrawal is None or deposit is None:
+                    return extracted_data  # Not a layout this extractor can read
+
+            # Header-derived edges may give fewer columns than the profile names
+            cells += [""] * (len(headers) - len(cells))
+
+            # Detect transaction date (DD/MM/YY format) in the date column
+            if DATE_PATTERN.match(cells[0]):
+                # Save previous entry before starting a new one
+                if current_entry:
+                    extracted_data.append(current_entry.finish(1))
+
+                transaction_date = cells[0]  # First column (Transaction Date)
+                posting_date = cells[posting] if posting is not None and DATE_TOKEN_PATTERN.match(cells[posting]) else ""
+                amount = cells[withdrawal] or cells[deposit]
+
+                # Create a new row entry
+                current_entry = Transaction([transaction_date, cells[narration], amount, posting_date])
+
+            else:
+                # If no date, it's a continuation of the previous description
+                if current_entry and cells[narration]:
+                    current_entry.extend(cells[narration])  # Joined onto the description once the entry is complete
 
         # Append the last row after loop
         if current_entry:
-            extracted_data.append(current_entry)
+            extracted_data.append(current_entry.finish(1))
 
+    return extracted_data
+
+if __name__ == "__main__":
     # Print extracted data
-    for row in extracted_data:
+    for row in extract_bank_statement("statement.pdf"):
         print(row)
-
-extract_bank_statement("statement.pdf")